@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.core.db import pool_report
+from app.core.security import require_admin
+from app.services.access_log import access_logger
+from app.services.image_variants import image_pipeline
+from app.services.principal_cache import Principal
+from app.services.sql_profiler import profile_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/db/pool")
+async def db_pool_stats(_admin: Principal = Depends(require_admin)):
+    return pool_report()
+
+
+@router.get("/access-log")
+async def access_log_stats(_admin: Principal = Depends(require_admin)):
+    return access_logger.stats()
+
+
+@router.get("/images")
+async def image_pipeline_stats(_admin: Principal = Depends(require_admin)):
+    return image_pipeline.stats()
+
+
+@router.get("/sql-profiles")
+async def recent_sql_profiles(_admin: Principal = Depends(require_admin)):
+    return profile_store.recent()
+
+
+@router.get("/sql-profiles/{request_id}")
+async def sql_profile(request_id: str, _admin: Principal = Depends(require_admin)):
+    profile = profile_store.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    return profile.report()
@@ -1,6 +1,10 @@
 from sqlalchemy import select
 from sqlalchemy.orm import Session
+from app.core.db import AsyncRepository
+from app.models.post import PostORM
 from app.models.user import UserORM
+from app.services.etag import bump_post_versions
+from app.services.principal_cache import refresh_principal
 
 
 
@@ -24,10 +28,48 @@ class UserRepository:
     
     def set_role(self, user:UserORM, role:str) -> UserORM:
         user.role = role
+        # el autor va embebido en PostPublic
+        bump_post_versions(self.db, PostORM.user_id == user.id)
         self.db.add(user)
         self.db.flush()
         self.db.refresh(user)
-        
+        refresh_principal(self.db, user)
         return user
-        
-    
\ No newline at end of file
+    
+    def update_password_hash(self, user:UserORM, hashed_password:str) -> UserORM:
+        user.hashed_password = hashed_password
+        self.db.add(user)
+        self.db.flush()
+        return user
+    
+    def set_active(self, user:UserORM, is_active:bool) -> UserORM:
+        user.is_active = is_active
+        # el autor va embebido en PostPublic
+        bump_post_versions(self.db, PostORM.user_id == user.id)
+        self.db.add(user)
+        self.db.flush()
+        self.db.refresh(user)
+        refresh_principal(self.db, user)
+        return user
+
+
+class AsyncUserRepository(AsyncRepository):
+    sync_repository = UserRepository
+    
+    async def get(self, user_id:int) -> UserORM | None:
+        return await self._run("get", user_id)
+    
+    async def get_by_email(self, email:str) -> UserORM | None:
+        return await self._run("get_by_email", email)
+    
+    async def create(self, email:str, hashed_password:str, full_name:str | None) -> UserORM:
+        return await self._run("create", email, hashed_password, full_name)
+    
+    async def set_role(self, user:UserORM, role:str) -> UserORM:
+        return await self._run("set_role", user, role)
+    
+    async def update_password_hash(self, user:UserORM, hashed_password:str) -> UserORM:
+        return await self._run("update_password_hash", user, hashed_password)
+    
+    async def set_active(self, user:UserORM, is_active:bool) -> UserORM:
+        return await self._run("set_active", user, is_active)
@@ -1,43 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, status
 
 from app.api.v1.auth import repository
-from app.api.v1.auth.repository import UserRepository
-from app.core.db import get_db
+from app.api.v1.auth.repository import AsyncUserRepository
+from app.core.db import get_async_db
 from app.models.user import UserORM
-from .schemas import RoleUpdate, TokenResponse, TokenData, UserCreate, UserLogin, UserPublic
+from app.services.principal_cache import Principal
+from .schemas import ActiveUpdate, RoleUpdate, TokenResponse, TokenData, UserCreate, UserLogin, UserPublic
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from app.core.security import create_access_token, decode_token, get_current_user, hash_password, verify_password, require_admin, oauth2_token
+from app.core.security import authenticate, create_access_token, decode_token, get_current_user, require_admin, oauth2_token
 from datetime import timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.compression import no_compression
+from app.services.password_hashing import password_hasher
 
 
 router = APIRouter(prefix="/auth", tags= ["auth"])
 
 @router.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
-def register(payload: UserCreate, db:Session = Depends(get_db)):
-    repository = UserRepository(db)
-    if repository.get_by_email(payload.email):
+async def register(payload: UserCreate, db:AsyncSession = Depends(get_async_db)):
+    repository = AsyncUserRepository(db)
+    if await repository.get_by_email(payload.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email ya registrado")
-    user = repository.create(
+    user = await repository.create(
         email = payload.email,
-        hashed_password = hash_password(payload.password),
+        hashed_password = await password_hasher.hash(payload.password),
         full_name = payload.full_name
     )
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return UserPublic.model_validate(user)
 
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login( payload : UserLogin ,db: Session = Depends(get_db)):
-    repository = UserRepository(db)
-    user = repository.get_by_email(payload.email)
-    if not user or not verify_password(payload.password, user.hashed_password):
+# el token no se comprime: secreto junto a datos del cliente (BREACH)
+@no_compression
+async def login( payload : UserLogin ,db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate(db, payload.email, payload.password)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales invalidas")
-    token = create_access_token(sub=str(user.id))
+    token = create_access_token(sub=str(user.id), role=user.role)
         
     return TokenResponse(access_token=token, user= UserPublic.model_validate(user))
 
@@ -46,20 +50,35 @@ async def read_me(current: UserORM = Depends(get_current_user)):
     return UserPublic.model_validate(current)
 
 @router.put("/role/{user_id}", response_model=UserPublic)
-def set_role(user_id: int = Path(..., ge=1),
+async def set_role(user_id: int = Path(..., ge=1),
              payload:RoleUpdate = None,
-             db: Session = Depends(get_db),
-             _admin:UserORM = Depends(require_admin)):
-    repository = UserRepository(db)
-    user = repository.get(user_id)
+             db: AsyncSession = Depends(get_async_db),
+             _admin: Principal = Depends(require_admin)):
+    repository = AsyncUserRepository(db)
+    user = await repository.get(user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    updated = await repository.set_role(user, payload.role)
+    await db.commit()
+    await db.refresh(updated)
+    return UserPublic.model_validate(updated)
+
+@router.put("/active/{user_id}", response_model=UserPublic)
+async def set_active(user_id: int = Path(..., ge=1),
+             payload:ActiveUpdate = None,
+             db: AsyncSession = Depends(get_async_db),
+             _admin: Principal = Depends(require_admin)):
+    repository = AsyncUserRepository(db)
+    user = await repository.get(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-    updated = repository.set_role(user, payload.role)
-    db.commit()
-    db.refresh(updated)
+    updated = await repository.set_active(user, payload.is_active)
+    await db.commit()
+    await db.refresh(updated)
     return UserPublic.model_validate(updated)
 
 @router.post("/token")
+@no_compression
 async def token_endpoint(response= Depends(oauth2_token)):
     return response
 
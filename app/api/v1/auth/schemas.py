@@ -22,6 +22,9 @@ class TokenResponse(BaseModel):
 
 class RoleUpdate(BaseModel):
     role: Role
+
+class ActiveUpdate(BaseModel):
+    is_active: bool
     
 class TokenData(BaseModel):
     sub: str
@@ -7,7 +7,10 @@ from sqlalchemy import select, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.core.db import AsyncRepository
 from app.models.category import CategoryORM
+from app.models.post import PostORM
+from app.services.etag import bump_post_versions
 
 
 class CategoryRepository:
@@ -45,10 +48,37 @@ class CategoryRepository:
     def update(self, category: CategoryORM, updates: dict) -> CategoryORM:
         for key, value in updates.items():
             setattr(category,key,value)
+        bump_post_versions(self.db, PostORM.category_id == category.id)
         self.db.add(category)
         self.db.flush()
         return category
             
 
     def delete(self, category: CategoryORM) -> None:
-        self.db.delete(category)
\ No newline at end of file
+        bump_post_versions(self.db, PostORM.category_id == category.id)
+        self.db.delete(category)
+
+
+class AsyncCategoryRepository(AsyncRepository):
+    sync_repository = CategoryRepository
+
+    async def list_many(self, *, skip: int = 0, limit: int = 50) -> Sequence[CategoryORM]:
+        return await self._run("list_many", skip=skip, limit=limit)
+
+    async def list_with_total(self, *, page: int = 1, per_page: int = 50) -> tuple[int, list[CategoryORM]]:
+        return await self._run("list_with_total", page=page, per_page=per_page)
+
+    async def get(self, category_id: int) -> CategoryORM | None:
+        return await self._run("get", category_id)
+
+    async def get_by_slug(self, slug: str) -> CategoryORM | None:
+        return await self._run("get_by_slug", slug)
+
+    async def create(self, *, name: str, slug: str) -> CategoryORM:
+        return await self._run("create", name=name, slug=slug)
+
+    async def update(self, category: CategoryORM, updates: dict) -> CategoryORM:
+        return await self._run("update", category, updates)
+
+    async def delete(self, category: CategoryORM) -> None:
+        return await self._run("delete", category)
@@ -1,58 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.api.v1.categories.repository import CategoryRepository
-from app.core.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.categories.repository import AsyncCategoryRepository
+from app.core.db import get_async_db
 from app.api.v1.categories.schemas import CategoryCreate, CategoryUpdate, CategoryPublic
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("", response_model=list[CategoryPublic])
-def list_categories(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    repository = CategoryRepository(db)
-    return repository.list_many(skip=skip, limit=limit)
+async def list_categories(skip: int = 0, limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncCategoryRepository(db)
+    return await repository.list_many(skip=skip, limit=limit)
 
 
 @router.post("", response_model=CategoryPublic, status_code=status.HTTP_201_CREATED)
-def create_category(data: CategoryCreate, db: Session = Depends(get_db)):
-    repository = CategoryRepository(db)
-    exist = repository.get_by_slug(data.slug)
+async def create_category(data: CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncCategoryRepository(db)
+    exist = await repository.get_by_slug(data.slug)
     if exist:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="slug en uso")
-    category = repository.create(name=data.name, slug=data.slug)
-    db.commit()
-    db.refresh(category)
+    category = await repository.create(name=data.name, slug=data.slug)
+    await db.commit()
+    await db.refresh(category)
     return category
 
 
 @router.get("/{category_id}", response_model=CategoryPublic)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    repository = CategoryRepository(db)
-    category = repository.get(category_id=category_id)
+async def get_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncCategoryRepository(db)
+    category = await repository.get(category_id=category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoria no encontrada")
     return category
 
 
 @router.put("/{category_id}", response_model=CategoryPublic)
-def update_category(category_id: int, data: CategoryUpdate, db: Session = Depends(get_db)):
-    repository = CategoryRepository(db)
-    category = repository.get(category_id=category_id)
+async def update_category(category_id: int, data: CategoryUpdate, db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncCategoryRepository(db)
+    category = await repository.get(category_id=category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoria no encontrada")
-    update = repository.update(category=category, updates = data.model_dump(exclude_unset= True))
-    db.commit()
-    db.refresh(update)
+    update = await repository.update(category=category, updates = data.model_dump(exclude_unset= True))
+    await db.commit()
+    await db.refresh(update)
     return update
     
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: int, db: Session = Depends(get_db)):
-    repository = CategoryRepository(db)
-    category = repository.get(category_id=category_id)
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncCategoryRepository(db)
+    category = await repository.get(category_id=category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoria no encontrada")
-    repository.delete(category=category)
-    db.commit()
+    await repository.delete(category=category)
+    await db.commit()
     return None
     
\ No newline at end of file
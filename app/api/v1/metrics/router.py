@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.db import pool_report
+from app.services.image_variants import image_pipeline
+from app.services.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    report = pool_report()
+    return PlainTextResponse(
+        metrics.render(pools={"sync": report["sync"], "async": report["async"]}, images=image_pipeline.stats()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,49 @@
+
+# Sparse fieldsets (?fields=id,title,tags): qué columnas y relaciones cargar y cómo serializarlas
+
+from typing import Any, Dict, FrozenSet, Optional
+
+from fastapi import HTTPException, status
+
+from app.api.v1.auth.schemas import UserPublic
+from app.api.v1.categories.schemas import CategoryPublic
+from .schemas import PostPublic, Tag
+
+POST_COLUMN_FIELDS = frozenset({"id", "title", "slug", "content", "image_url", "image_variants"})
+POST_RELATION_FIELDS = frozenset({"tags", "user", "category"})
+POST_FIELDS = POST_COLUMN_FIELDS | POST_RELATION_FIELDS
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    if fields is None:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - POST_FIELDS
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no válidos: {', '.join(sorted(unknown)) or fields}. Permitidos: {', '.join(sorted(POST_FIELDS))}"
+        )
+    return requested
+
+
+def serialize_fields(post, fields: FrozenSet[str]) -> Dict[str, Any]:
+    # mismo orden de claves que PostPublic
+    data = {}
+    for name in PostPublic.model_fields:
+        if name not in fields:
+            continue
+        value = getattr(post, name)
+        if name == "tags":
+            value = [Tag.model_validate(tag).model_dump() for tag in value]
+        elif name == "user":
+            value = UserPublic.model_validate(value).model_dump() if value is not None else None
+        elif name == "category":
+            value = CategoryPublic.model_validate(value).model_dump() if value is not None else None
+        data[name] = value
+    return data
+
+
+def fields_representation(fields: FrozenSet[str]) -> str:
+    # cada combinación de campos es una representación distinta para el ETag
+    return "fields:" + ",".join(sorted(fields))
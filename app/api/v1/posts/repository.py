@@ -1,55 +1,230 @@
 from fastapi import Depends
-from sqlalchemy.orm import Session,selectinload, joinedload
-from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session,selectinload, joinedload, lazyload, load_only
+from typing import Dict, FrozenSet, Iterable, List, Literal, Optional, Tuple
 from app.api.v1.auth.schemas import UserPublic
 from app.core.security import get_current_user
-from app.models import PostORM, TagORM, UserORM
+from app.models import CategoryORM, PostORM, TagORM, UserORM, post_tags
 from app.core import db
-from sqlalchemy import func, select
+from app.core.db import AsyncRepository
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.services.media_store import acquire_media, release_media
+from app.services.pagination import CountStrategy, count_query, decode_cursor, encode_cursor, mark_counts_dirty, normalize_filter
+from app.services.principal_cache import Principal
+from app.services.tag_cache import forget_tag, normalize_tag, remember_tags, sync_tag_cache, tag_cache
+from app.services.post_search import SearchField, index_post, index_rows, match_subquery, unindex_post
+from app.utils.slugify_utils import allocate_unique_slugs, ensure_unique_slug
+
+PostShape = Literal["full", "summary"]
+
+SLUG_MAX_ATTEMPTS = 5
+SLUG_LOOKUP_CHUNK = 500
+
+# Plan de carga por forma de respuesta. La sesión async no permite lazy load al serializar,
+# así que todo lo que usa el schema se carga aquí con un número fijo de consultas:
+#   full    -> PostPublic: autor y categoría en el mismo SELECT, tags en un único SELECT IN
+#              (sin seguir TagORM.posts, que es selectin y arrastraría todos los posts del tag)
+#   summary -> PostSummary: solo columnas del post
+LOAD_PLANS = {
+    "full": (
+        joinedload(PostORM.user),
+        joinedload(PostORM.category),
+        selectinload(PostORM.tags).lazyload(TagORM.posts),
+    ),
+    "summary": (
+        lazyload(PostORM.user),
+        lazyload(PostORM.category),
+        lazyload(PostORM.tags),
+    ),
+}
+
+POST_COLUMNS = {
+    "id": PostORM.id,
+    "title": PostORM.title,
+    "slug": PostORM.slug,
+    "content": PostORM.content,
+    "image_url": PostORM.image_url,
+    "image_variants": PostORM.image_variants,
+}
+
+def fieldset_plan(fields:FrozenSet[str]) -> tuple:
+    # SELECT proyectado: solo las columnas pedidas (+ las del ETag) y solo las relaciones pedidas
+    columns = [PostORM.id, PostORM.version, PostORM.created_at]
+    columns += [POST_COLUMNS[name] for name in sorted(fields) if name in POST_COLUMNS and name != "id"]
+    return (
+        load_only(*columns),
+        joinedload(PostORM.user) if "user" in fields else lazyload(PostORM.user),
+        joinedload(PostORM.category) if "category" in fields else lazyload(PostORM.category),
+        selectinload(PostORM.tags).lazyload(TagORM.posts) if "tags" in fields else lazyload(PostORM.tags),
+    )
+
+def load_plan(shape:PostShape = "full", fields:Optional[FrozenSet[str]] = None) -> tuple:
+    return LOAD_PLANS[shape] if fields is None else fieldset_plan(fields)
+
+def bulk_error_detail(error:SQLAlchemyError) -> str:
+    # Mensaje legible para el cliente a partir del error de la BD (SQLite y Postgres nombran
+    # la columna o la restricción en el texto)
+    message = str(getattr(error, "orig", None) or error).splitlines()[0]
+    if isinstance(error, IntegrityError):
+        lowered = message.lower()
+        if "slug" in lowered:
+            return "Slug en conflicto con otro post"
+        if "title" in lowered:
+            return "El título del post ya existe"
+        if "foreign key" in lowered:
+            return "Referencia inválida (categoría, usuario o tag)"
+    return f"Error de base de datos: {message}"
 
-from app.utils.slugify_utils import ensure_unique_slug, slugify_base
 
 class PostRepository:
     def __init__(self, db:Session):
         self.db = db
         
-    def get(self, post_id:int) -> Optional[PostORM]:
-        post_find = select(PostORM).where(PostORM.id == post_id)
+    def get(self, post_id:int, shape:PostShape = "full", fields:Optional[FrozenSet[str]] = None) -> Optional[PostORM]:
+        post_find = select(PostORM).options(*load_plan(shape, fields)).where(PostORM.id == post_id)
         return self.db.execute(post_find).scalar_one_or_none()
     
-    def get_by_slug(self, slug: str) -> Optional[PostORM]:
+    def get_version(self, post_id:int):
+        # solo las columnas del ETag, sin cargar el post ni sus tags
+        query = select(PostORM.id, PostORM.version, PostORM.created_at).where(PostORM.id == post_id)
+        return self.db.execute(query).first()
+    
+    def get_version_by_slug(self, slug:str):
+        query = select(PostORM.id, PostORM.version, PostORM.created_at).where(PostORM.slug == slug)
+        return self.db.execute(query).first()
+    
+    def get_by_slug(self, slug: str, shape:PostShape = "full", fields:Optional[FrozenSet[str]] = None) -> Optional[PostORM]:
         query = (
-            select(PostORM).where(PostORM.slug == slug)
+            select(PostORM).options(*load_plan(shape, fields)).where(PostORM.slug == slug)
         )
         return self.db.execute(query).scalar_one_or_none()
     
+    def _search_query(self, query:Optional[str] = None, search_in:SearchField = "all", fields:Optional[FrozenSet[str]] = None):
+        results = select(PostORM).options(*load_plan("full", fields))
+        rank = None
+        if query:
+            # búsqueda en el índice de texto completo (título y/o contenido)
+            matches = match_subquery(self.db, query, search_in)
+            results = results.join(matches, matches.c.post_id == PostORM.id)
+            rank = matches.c.rank
+        return results, rank
+    
+    def _order_column(self, order_by:Optional[str] = None, rank = None):
+        if order_by == "relevance" and rank is not None:
+            return rank
+        if order_by == "title":
+            return func.lower(PostORM.title)
+        return PostORM.id
+    
+    def _count(self, results, query:Optional[str], search_in:SearchField, count_strategy:CountStrategy) -> Optional[int]:
+        return count_query(
+            self.db,
+            results,
+            strategy=count_strategy,
+            scope="posts",
+            cache_key=normalize_filter(q=query, search_in=search_in if query else None)
+        )
+    
     def search(
         self,
         query:Optional[str] = None,
         order_by:Optional[str] = None,
         direction:Optional[str] = None,
         page:Optional[int] = None,
-        per_page:Optional[int] = None) -> Tuple[int,List[PostORM]]:
+        per_page:Optional[int] = None,
+        search_in:SearchField = "all",
+        count_strategy:CountStrategy = "exact",
+        fields:Optional[FrozenSet[str]] = None) -> Tuple[Optional[int],List[PostORM],bool]:
         
-        results = select(PostORM)        
-        if query:
-            # list comprehension to filter posts by title
-            results =  results.where(PostORM.title.ilike(f"%{query}%"))
+        results, rank = self._search_query(query, search_in, fields)
         
-        total = self.db.scalar(select(func.count()).select_from(results.subquery()))
+        total = self._count(results, query, search_in, count_strategy)
         
         if total == 0:
-            return 0, []
+            return 0, [], False
+        
+        order_column = self._order_column(order_by, rank)
         
-        if order_by == "id":
-            order_column = PostORM.id
+        ordering = [order_column.asc() if direction == "asc" else order_column.desc()]
+        if order_column is not PostORM.id:
+            ordering.append(PostORM.id.asc())
+        results = results.order_by(*ordering)
+        # fila extra para saber si hay página siguiente aunque no se cuente
+        items = self.db.execute(results.offset((page - 1) * per_page).limit(per_page + 1)).scalars().all()
+        
+        return total, items[:per_page], len(items) > per_page
+    
+    def search_keyset(
+        self,
+        query:Optional[str] = None,
+        order_by:str = "id",
+        direction:str = "asc",
+        per_page:int = 10,
+        cursor:Optional[str] = None,
+        search_in:SearchField = "all",
+        count_strategy:CountStrategy = "exact",
+        fields:Optional[FrozenSet[str]] = None) -> Tuple[Optional[int], List[PostORM], Optional[str], Optional[str]]:
+        # Paginación por cursor sobre (clave de orden, id): el coste no depende de la profundidad
+        results, rank = self._search_query(query, search_in, fields)
+        total = self._count(results, query, search_in, count_strategy)
+        
+        if total == 0:
+            return 0, [], None, None
+        
+        order_column = self._order_column(order_by, rank)
+        if order_column is PostORM.id:
+            key_type = int
+        elif order_column is rank:
+            key_type = float
+        else:
+            key_type = str
+        
+        backwards = False
+        boundary = None
+        if cursor:
+            payload = decode_cursor(cursor, key_type)
+            if payload.get("o") != order_by or payload.get("d") != direction:
+                raise ValueError("El cursor no corresponde a este orden")
+            backwards = bool(payload.get("b"))
+            boundary = (payload["k"], payload["i"])
+        
+        sort_key = order_column.label("sort_key")
+        # Hacia atrás se recorre en sentido inverso y luego se da la vuelta a la página
+        ascending = (direction == "asc") != backwards
+        
+        if boundary is not None:
+            if order_column is PostORM.id:
+                condition = PostORM.id > boundary[1] if ascending else PostORM.id < boundary[1]
+            else:
+                key = tuple_(order_column, PostORM.id)
+                condition = key > tuple_(*boundary) if ascending else key < tuple_(*boundary)
+            results = results.where(condition)
+        
+        if order_column is PostORM.id:
+            ordering = [PostORM.id.asc() if ascending else PostORM.id.desc()]
         else:
-            order_column = func.lower(PostORM.title)
+            ordering = [order_column.asc(), PostORM.id.asc()] if ascending else [order_column.desc(), PostORM.id.desc()]
         
-        results = results.order_by(order_column.asc() if direction == "asc" else order_column.desc())
-        items = self.db.execute(results.offset((page - 1) * per_page).limit(per_page)).scalars().all()
+        # Se pide una fila extra para saber si hay más páginas en ese sentido
+        rows = self.db.execute(
+            results.add_columns(sort_key).order_by(*ordering).limit(per_page + 1)
+        ).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
         
-        return total, items
+        has_next = has_more if not backwards else True
+        has_prev = has_more if backwards else boundary is not None
+        
+        def make_cursor(row, before:bool) -> str:
+            return encode_cursor({"o": order_by, "d": direction, "k": row.sort_key, "i": row[0].id, "b": before})
+        
+        next_cursor = make_cursor(rows[-1], False) if rows and has_next else None
+        prev_cursor = make_cursor(rows[0], True) if rows and has_prev else None
+        
+        return total, [row[0] for row in rows], next_cursor, prev_cursor
     
     def by_tags(self, tags:List[str]) -> List[PostORM]:
         normalized_tags_names = [tag.strip().lower() for tag in tags if tag.strip()]
@@ -58,8 +233,7 @@ class PostRepository:
             return []
         
         post_list = select(PostORM).options(
-            selectinload(PostORM.tags),
-            joinedload(PostORM.user)).where(PostORM.tags.any(
+            *LOAD_PLANS["full"]).where(PostORM.tags.any(
                 func.lower(TagORM.name).in_(normalized_tags_names)
             )).order_by(PostORM.id.asc())
             
@@ -81,19 +255,44 @@ class PostRepository:
 
     
     def ensure_tag(self, tag_name:str) -> TagORM:
-        normalize = tag_name.strip().lower()
+        normalize = normalize_tag(tag_name)
+        sync_tag_cache(self.db)
+        cached_id = tag_cache.get(normalize)
+        if cached_id is not None:
+            tag_obj = self.db.get(TagORM, cached_id, options=[lazyload(TagORM.posts)])
+            if tag_obj:
+                return tag_obj
+            forget_tag(self.db, normalize)
+        
         tag_obj = self.db.execute(
-            select(TagORM).where(func.lower(TagORM.name) == normalize)
+            select(TagORM).options(lazyload(TagORM.posts)).where(func.lower(TagORM.name) == normalize)
         ).scalar_one_or_none()
         
         if tag_obj:
+            remember_tags(self.db, {normalize: tag_obj.id})
             return tag_obj
         
         tag_obj = TagORM(name=tag_name)
         self.db.add(tag_obj)
         self.db.flush()
+        mark_counts_dirty(self.db, "tags")
+        remember_tags(self.db, {normalize: tag_obj.id})
         return tag_obj
     
+    def _insert_with_unique_slug(self, post:PostORM) -> None:
+        # El contador ya reparte números sin repetir; si aun así el slug existe (creado a mano o
+        # antes del contador) se pide el siguiente número, sin volver a recorrer los slugs
+        for attempt in range(SLUG_MAX_ATTEMPTS):
+            post.slug = ensure_unique_slug(self.db, post.title)
+            try:
+                with self.db.begin_nested():
+                    self.db.add(post)
+                    self.db.flush()
+                return
+            except IntegrityError as e:
+                if "slug" not in str(e.orig) or attempt == SLUG_MAX_ATTEMPTS - 1:
+                    raise
+    
     def create_post(
         self,
         title:str,
@@ -108,33 +307,136 @@ class PostRepository:
             author_obj = self.ensure_author(
                 user.full_name,user.email)
             
-        unique_slug = ensure_unique_slug(self.db, title)    
-        
-        
         post = PostORM(
             title=title,
-            slug = unique_slug,
             content=content,
             image_url=image_url,
-            user=author_obj,
+            # por id: asignar la relación añadiría el post a author.posts antes del savepoint del slug
+            user_id=author_obj.id if author_obj else None,
             category_id=category_id
         )
-        for tag in tags:
-            names = tag["name"].split(",")
-            for name in names:
-                name = name.strip().lower()
-                if not name:
-                    continue
-                tag_obj = self.ensure_tag(name)
-                post.tags.append(tag_obj)
-        self.db.add(post)
-        self.db.flush()
+        names = list(dict.fromkeys(
+            normalize_tag(name) for tag in tags for name in tag["name"].split(",") if name.strip()
+        ))
+        # ids desde la caché de tags: sin SELECT por nombre si ya se conocen
+        tag_ids = self.resolve_tags(names)
+        self._insert_with_unique_slug(post)
+        if names:
+            self.db.execute(insert(post_tags), [{"post_id": post.id, "tag_id": tag_ids[name]} for name in names])
+        acquire_media(self.db, [image_url])
+        index_post(self.db, post)
+        mark_counts_dirty(self.db, "posts")
         self.db.refresh(post)
         return post
    
    
    
     
+    def resolve_tags(self, names:Iterable[str]) -> Dict[str, int]:
+        # nombre normalizado -> id: primero la caché, luego un único IN; las que faltan se insertan en bloque
+        names = {name for name in names if name}
+        if not names:
+            return {}
+        sync_tag_cache(self.db)
+        resolved = tag_cache.get_many(names)
+        unknown = names - resolved.keys()
+        if not unknown:
+            return resolved
+        lookup = select(TagORM.id, func.lower(TagORM.name))
+        found = {name: tag_id for tag_id, name in self.db.execute(lookup.where(func.lower(TagORM.name).in_(unknown)))}
+        missing = sorted(unknown - found.keys())
+        if missing:
+            self.db.execute(insert(TagORM), [{"name": name} for name in missing])
+            mark_counts_dirty(self.db, "tags")
+            found.update({name: tag_id for tag_id, name in self.db.execute(lookup.where(func.lower(TagORM.name).in_(missing)))})
+        remember_tags(self.db, found)
+        resolved.update(found)
+        return resolved
+    
+    def _bulk_insert(self, items:List[Tuple[int, dict]], user:Optional[Principal]) -> Tuple[List[dict], List[dict]]:
+        created, errors = [], []
+        
+        titles = [item["title"] for _, item in items]
+        taken = set(self.db.execute(select(PostORM.title).where(PostORM.title.in_(titles))).scalars())
+        category_ids = {item["category_id"] for _, item in items if item.get("category_id")}
+        known_categories = set(
+            self.db.execute(select(CategoryORM.id).where(CategoryORM.id.in_(category_ids))).scalars()
+        ) if category_ids else set()
+        
+        valid = []
+        for index, item in items:
+            if item["title"] in taken:
+                errors.append({"index": index, "title": item["title"], "detail": "El título del post ya existe"})
+            elif item.get("category_id") and item["category_id"] not in known_categories:
+                errors.append({"index": index, "title": item["title"], "detail": "Categoria no encontrada"})
+            else:
+                taken.add(item["title"])
+                valid.append((index, item))
+        if not valid:
+            return created, errors
+        
+        # mismas reglas que create_post: "a,b" se separa, se normaliza y no se repite
+        post_tag_names = [
+            list(dict.fromkeys(name.strip().lower() for tag in item["tags"] for name in tag.split(",") if name.strip()))
+            for _, item in valid
+        ]
+        tag_ids = self.resolve_tags(name for names in post_tag_names for name in names)
+        slugs = allocate_unique_slugs(self.db, [item["title"] for _, item in valid], max_attempts=SLUG_MAX_ATTEMPTS)
+        
+        rows = [
+            {
+                "title": item["title"],
+                "slug": slug,
+                "content": item.get("content"),
+                "image_url": item.get("image_url"),
+                "category_id": item.get("category_id"),
+                "user_id": user.id if user else None,
+            }
+            for (_, item), slug in zip(valid, slugs)
+        ]
+        # executemany sin RETURNING: con RETURNING ordenado SQLite hace un INSERT por fila.
+        # Los ids se recuperan después por slug, que es único
+        self.db.execute(insert(PostORM), rows)
+        ids_by_slug = {}
+        for start in range(0, len(slugs), SLUG_LOOKUP_CHUNK):
+            chunk = slugs[start:start + SLUG_LOOKUP_CHUNK]
+            ids_by_slug.update(self.db.execute(select(PostORM.slug, PostORM.id).where(PostORM.slug.in_(chunk))).all())
+        post_ids = [ids_by_slug[slug] for slug in slugs]
+        
+        links = [
+            {"post_id": post_id, "tag_id": tag_ids[name]}
+            for post_id, names in zip(post_ids, post_tag_names)
+            for name in names
+        ]
+        if links:
+            self.db.execute(insert(post_tags), links)
+        acquire_media(self.db, [row["image_url"] for row in rows])
+        
+        index_rows(self.db, [{"id": post_id, "title": row["title"], "content": row["content"]} for post_id, row in zip(post_ids, rows)])
+        mark_counts_dirty(self.db, "posts")
+        
+        created = [{"index": index, "id": post_id, "slug": row["slug"]} for (index, _), post_id, row in zip(valid, post_ids, rows)]
+        return created, errors
+    
+    def bulk_create_posts(self, items:List[Tuple[int, dict]], user:Optional[Principal]) -> Tuple[List[dict], List[dict]]:
+        # Un bloque entero con executemany; si la BD lo rechaza se repite post a post para aislar el fallo
+        try:
+            with self.db.begin_nested():
+                return self._bulk_insert(items, user)
+        except SQLAlchemyError:
+            pass
+        
+        created, errors = [], []
+        for index, item in items:
+            try:
+                with self.db.begin_nested():
+                    item_created, item_errors = self._bulk_insert([(index, item)], user)
+            except SQLAlchemyError as e:
+                item_created, item_errors = [], [{"index": index, "title": item.get("title"), "detail": bulk_error_detail(e)}]
+            created += item_created
+            errors += item_errors
+        return created, errors
+    
     def update_post(
         self,
         post:PostORM,
@@ -142,12 +444,66 @@ class PostRepository:
     ) -> PostORM:
         for key, value in updates.items():
             setattr(post, key, value) 
+        post.version = (post.version or 0) + 1
         self.db.add(post)
         self.db.flush()
+        index_post(self.db, post)
+        mark_counts_dirty(self.db, "posts")
         self.db.refresh(post)
         return post
         
     
-    def delete_post(self, post:PostORM) -> None:
+    def set_image_variants(self, post_id:int, image_url:str, variants:List[dict]) -> bool:
+        # solo si el post sigue apuntando a la misma imagen; nueva versión para invalidar los ETag
+        result = self.db.execute(
+            update(PostORM)
+            .where(PostORM.id == post_id, PostORM.image_url == image_url)
+            .values(image_variants=variants, version=PostORM.version + 1)
+        )
+        return result.rowcount == 1
+
+    def delete_post(self, post:PostORM) -> List[str]:
+        unindex_post(self.db, post.id)
+        # blobs que ningún otro post usa: el router aparta sus archivos antes del commit
+        released = release_media(self.db, [post.image_url])
         self.db.delete(post)
-        self.db.flush()
\ No newline at end of file
+        self.db.flush()
+        mark_counts_dirty(self.db, "posts")
+        return released
+
+
+class AsyncPostRepository(AsyncRepository):
+    sync_repository = PostRepository
+    
+    async def get(self, post_id:int, shape:PostShape = "full", fields:Optional[FrozenSet[str]] = None) -> Optional[PostORM]:
+        return await self._run("get", post_id, shape, fields)
+    
+    async def get_version(self, post_id:int):
+        return await self._run("get_version", post_id)
+    
+    async def get_version_by_slug(self, slug:str):
+        return await self._run("get_version_by_slug", slug)
+    
+    async def get_by_slug(self, slug:str, shape:PostShape = "full", fields:Optional[FrozenSet[str]] = None) -> Optional[PostORM]:
+        return await self._run("get_by_slug", slug, shape, fields)
+    
+    async def search(self, **kwargs) -> Tuple[Optional[int],List[PostORM],bool]:
+        return await self._run("search", **kwargs)
+    
+    async def search_keyset(self, **kwargs) -> Tuple[Optional[int], List[PostORM], Optional[str], Optional[str]]:
+        return await self._run("search_keyset", **kwargs)
+    
+    async def by_tags(self, tags:List[str]) -> List[PostORM]:
+        return await self._run("by_tags", tags)
+    
+    async def create_post(self, **kwargs) -> PostORM:
+        return await self._run("create_post", **kwargs)
+    
+    async def bulk_create_posts(self, items:List[Tuple[int, dict]], user:Optional[Principal]) -> Tuple[List[dict], List[dict]]:
+        return await self._run("bulk_create_posts", items, user)
+    
+    async def update_post(self, post:PostORM, updates:dict) -> PostORM:
+        return await self._run("update_post", post, updates)
+    
+    async def delete_post(self, post:PostORM) -> List[str]:
+        return await self._run("delete_post", post)
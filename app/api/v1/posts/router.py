@@ -1,20 +1,33 @@
-from app.core.db import get_db
-from .schemas import PostCreate, PostPublic, PostSummary, PaginatedPost, PostUpdate
-from .repository import PostRepository
+from app.core.db import get_async_db
+from .schemas import PostBulkItem, PostBulkResult, PostCreate, PostPublic, PostSummary, PaginatedPost, PostUpdate
+from .repository import AsyncPostRepository
+from .fields import fields_representation, parse_fields, serialize_fields
+from .serializers import PostSerializer, json_response, paginated, summary
 from typing import List, Optional, Literal, Union, Annotated
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response, status, UploadFile, File
+from pydantic import ValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from app.core.security import oauth2_scheme, get_current_user
+from app.core.security import oauth2_scheme, get_current_principal, get_current_user, require_editor
+from app.services.principal_cache import Principal
 import time
 import asyncio
-from app.services.file_storage import save_uploaded_file
+from app.services.file_storage import detach_blob_files, inspect_upload, purge_blob_files, restore_blob_files, store_upload
+from app.services.image_variants import image_pipeline
+from app.services.bulk_ingest import batched, iter_bulk_entries
+from app.services.etag import etag_matches, post_etag
+from app.services.pagination import CountStrategy
+from app.services.post_search import SearchField
+from app.core.config import settings
 
 router = APIRouter(prefix ="/posts", tags=["posts"])
 
 
 @router.get("", response_model=PaginatedPost)
-def list_posts(
+async def list_posts(
     text: Optional[str] = Query(
     default=None,
     description="Parametro obsoleto",
@@ -22,7 +35,7 @@ def list_posts(
     ),
     query: Optional[str] = Query(
     default=None,
-    description="Buscar en los títulos de los posts",
+    description="Buscar en el título y el contenido de los posts (texto completo)",
     alias="q",
     min_length=3,
     max_length=100,
@@ -39,75 +52,168 @@ def list_posts(
         default=0,
         ge=0,
         description="Número de posts a omitir"),
-    order_by: Literal["title", "id"] = Query(
-        "id",
-        description="Campo por el cual ordenar los posts",
+    search_in: SearchField = Query(
+        "all",
+        description="Campos en los que buscar: all, title o content"),
+    order_by: Optional[Literal["title", "id", "relevance"]] = Query(
+        None,
+        description="Campo por el cual ordenar los posts (por defecto relevance si hay búsqueda, si no id)",
         example="title"),
     direction: Literal["asc", "desc"] = Query(
         "asc",
         description="Dirección de ordenamiento"),
-    db: Session = Depends(get_db)
+    pagination: Literal["offset", "cursor"] = Query(
+        "offset",
+        description="Modo de paginación: offset (clásico) o cursor (keyset)"),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Cursor opaco devuelto en next_cursor/prev_cursor (activa el modo cursor)"),
+    count: Optional[CountStrategy] = Query(
+        default=None,
+        description="Cómo calcular el total: exact, cached, estimated o none"),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Campos a devolver separados por comas (id,title,slug,content,image_url,image_variants,tags,user,category)",
+        examples=["id,title,slug"]),
+    db: AsyncSession = Depends(get_async_db)
     ):
     
     offset = offset or 0
     limit = limit or 10
     page=(offset // limit) + 1
-    repository = PostRepository(db)
+    repository = AsyncPostRepository(db)
     query = query or text
-    total, items = repository.search(
-        query=query,
-        order_by=order_by,
-        direction=direction,
-        page=page or 1,
-        per_page=limit
-    )
+    order_by = order_by or ("relevance" if query else "id")
+    count = count or settings.PAGINATION_COUNT_STRATEGY
+    selected = parse_fields(fields)
     
-    return PaginatedPost(
-        page=(offset // limit) + 1,
-        per_page=limit,
-        total_pages=(total + limit -1) // limit,
-        has_prev=offset > 0,
-        has_next=offset + limit < total,
-        order_by=order_by,
-        direction=direction,
-        search=query,
-        total=total,
-        limit=limit,
-        offset=offset,
-        items= items
-    )
+    if cursor or pagination == "cursor":
+        try:
+            total, items, next_cursor, prev_cursor = await repository.search_keyset(
+                query=query,
+                order_by=order_by,
+                direction=direction,
+                per_page=limit,
+                cursor=cursor,
+                search_in=search_in,
+                count_strategy=count,
+                fields=selected
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        meta = dict(
+            page=None,
+            per_page=limit,
+            total_pages=(total + limit -1) // limit if total is not None else None,
+            has_prev=prev_cursor is not None,
+            has_next=next_cursor is not None,
+            order_by=order_by,
+            direction=direction,
+            search=query,
+            total=total,
+            limit=limit,
+            offset=None,
+            pagination="cursor",
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor
+        )
+    else:
+        total, items, has_next = await repository.search(
+            query=query,
+            order_by=order_by,
+            direction=direction,
+            page=page or 1,
+            per_page=limit,
+            search_in=search_in,
+            count_strategy=count,
+            fields=selected
+        )
+        
+        meta = dict(
+            page=(offset // limit) + 1,
+            per_page=limit,
+            total_pages=(total + limit -1) // limit if total is not None else None,
+            has_prev=offset > 0,
+            has_next=has_next,
+            order_by=order_by,
+            direction=direction,
+            search=query,
+            total=total,
+            limit=limit,
+            offset=offset
+        )
+    
+    if selected is None:
+        if settings.SERIALIZATION_MODE == "fast":
+            return json_response(paginated(meta, PostSerializer().posts(items)))
+        return PaginatedPost(**meta, items=items)
+    
+    # items parciales: no encajan en PostPublic, se devuelven sin pasar por response_model
+    body = PaginatedPost.model_construct(**meta, items=[]).model_dump()
+    body["items"] = [serialize_fields(post, selected) for post in items]
+    return JSONResponse(content=jsonable_encoder(body))
     
 
 @router.get("/by-tags", response_model=List[PostPublic])
-def filter_posts_by_tags(
+async def filter_posts_by_tags(
     tags: List[str] = Query(
         ...,
         min_length=2,
         max_length=30,
         description="Lista de tags para filtrar los posts"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
     ):
-    repository = PostRepository(db)
-    posts = repository.by_tags(tags)
+    repository = AsyncPostRepository(db)
+    posts = await repository.by_tags(tags)
+    if settings.SERIALIZATION_MODE == "fast":
+        return json_response(PostSerializer().posts(posts))
     return posts
     
     
 @router.get("/{post_id}", response_model=Union[PostPublic, PostSummary], response_description="Post encontrado")
-def get_post(post_id:int = Path(
+async def get_post(
+    response: Response,
+    post_id:int = Path(
     ...,
     description="ID del post a obtener",
     ge=1,
     title="ID del post",
     example=1),
     include_content: bool = Query(default=True, description="Incluir el contenido del post"),
-    db: Session = Depends(get_db)):
+    fields: Optional[str] = Query(default=None, description="Campos a devolver separados por comas"),
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db)):
+    
+    repository = AsyncPostRepository(db)
+    selected = parse_fields(fields)
+    representation = "full" if include_content else "summary"
+    etag_representation = fields_representation(selected) if selected else representation
     
-    repository = PostRepository(db)
-    post = repository.get(post_id)
+    # 304 sin cargar ni serializar el post si el cliente ya tiene la versión actual
+    if if_none_match:
+        current = await repository.get_version(post_id)
+        if not current:
+            raise HTTPException(status_code=404, detail="Post no encontrado")
+        etag = post_etag(current.id, current.version, current.created_at, etag_representation)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    post = await repository.get(post_id, shape=representation, fields=selected)
         
     if not post:
         raise HTTPException(status_code=404, detail="Post no encontrado")
     
+    response.headers["ETag"] = post_etag(post.id, post.version, post.created_at, etag_representation)
+    response.headers["Cache-Control"] = "no-cache"
+    
+    if selected is not None:
+        return JSONResponse(content=jsonable_encoder(serialize_fields(post, selected)), headers=dict(response.headers))
+    
+    if settings.SERIALIZATION_MODE == "fast":
+        data = PostSerializer().post(post) if include_content else summary(post)
+        return json_response(data, headers=dict(response.headers))
+    
     if include_content:
         return PostPublic.model_validate(post,from_attributes=True)
     else:
@@ -115,23 +221,23 @@ def get_post(post_id:int = Path(
     
 
 @router.post("", response_model=PostPublic, status_code=status.HTTP_201_CREATED, response_description="Post creado exitosamente")
-def create_post(
+async def create_post(
     post: Annotated[PostCreate, Depends(PostCreate.as_form)],
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user = Depends(get_current_user),
 ):
-    repository = PostRepository(db)
+    repository = AsyncPostRepository(db)
 
     try:
         saved = None
         if image is not None:
-            saved = save_uploaded_file(image)
+            saved = await run_in_threadpool(inspect_upload, image)
 
         image_url = saved["url"] if saved else None
         
 
-        post_db = repository.create_post(
+        post_db = await repository.create_post(
             title=post.title,
             content=post.content,
             tags=[tag.model_dump() for tag in post.tags],
@@ -139,65 +245,155 @@ def create_post(
             user=user,
             category_id=post.category_id
         )
-        db.commit()
-        db.refresh(post_db)
-        return post_db
+        if saved:
+            # la referencia ya está contada (acquire_media en create_post): solo ahora se decide
+            # si hace falta escribir el blob, dentro de la misma transacción
+            saved["stored"] = await run_in_threadpool(store_upload, image, saved)
+        await db.commit()
+        if saved:
+            # derivados en segundo plano: la respuesta no espera al redimensionado
+            image_pipeline.submit(post_db.id, saved["path"], image_url)
+        # se relee con autor y categoría cargados para serializar fuera de la sesión
+        created = await repository.get(post_db.id)
+        if settings.SERIALIZATION_MODE == "fast":
+            return json_response(PostSerializer().post(created), status_code=status.HTTP_201_CREATED)
+        return created
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=409, detail="El título del post ya existe")
 
     # except SQLAlchemyError:
-    #     db.rollback()
+    #     await db.rollback()
     #     raise HTTPException(status_code=500, detail="Error al crear el post")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
 
 
+@router.post("/bulk", response_model=PostBulkResult, response_description="Resultado por post del lote")
+async def bulk_create_posts(
+    request: Request,
+    chunk_size: Optional[int] = Query(
+        default=None,
+        ge=1,
+        le=settings.BULK_MAX_CHUNK_SIZE,
+        description="Posts por bloque de inserción (NDJSON con Content-Type application/x-ndjson, o un array JSON)"),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_editor),
+):
+    repository = AsyncPostRepository(db)
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    received = 0
+    created, errors = [], []
+    
+    entries = iter_bulk_entries(request.headers.get("content-type"), request.stream())
+    async for batch in batched(entries, chunk_size):
+        items = []
+        for index, value, error in batch:
+            received += 1
+            if error:
+                errors.append({"index": index, "detail": error})
+                continue
+            try:
+                items.append((index, PostBulkItem.model_validate(value).model_dump()))
+            except ValidationError as e:
+                errors.append({"index": index, "detail": e.errors(include_url=False, include_context=False)})
+        if not items:
+            continue
+        # cada bloque se confirma por separado: un error no deshace lo ya insertado
+        batch_created, batch_errors = await repository.bulk_create_posts(items, user)
+        await db.commit()
+        created += batch_created
+        errors += batch_errors
+    
+    return PostBulkResult(
+        received=received,
+        created=len(created),
+        failed=len(errors),
+        items=created,
+        errors=sorted(errors, key=lambda error: error["index"])
+    )
+
+
 @router.put("/{post_id}", response_model=PostPublic, status_code=status.HTTP_202_ACCEPTED)
-def update_post(post_id:int, data:PostUpdate, db: Session = Depends(get_db),user = Depends(get_current_user)):
+async def update_post(post_id:int, data:PostUpdate, db: AsyncSession = Depends(get_async_db),user = Depends(get_current_principal)):
     
-    repository = PostRepository(db)
-    post = repository.get(post_id)
+    repository = AsyncPostRepository(db)
+    post = await repository.get(post_id)
     
     if not post:
         raise HTTPException(status_code=404, detail="Post no encontrado") 
     try:
         updates = data.model_dump(exclude_unset=True) 
-        post = repository.update_post(post, updates)
-        db.commit()
-        db.refresh(post)
-        return post
+        post = await repository.update_post(post, updates)
+        await db.commit()
+        updated = await repository.get(post.id)
+        if settings.SERIALIZATION_MODE == "fast":
+            return json_response(PostSerializer().post(updated), status_code=status.HTTP_202_ACCEPTED)
+        return updated
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Error al actualizar el post")
     
 
 @router.delete("/{post_id}", status_code=status.HTTP_202_ACCEPTED, response_description="Post eliminado exitosamente")
-def delete_post(post_id:int, db: Session = Depends(get_db),user = Depends(get_current_user)): 
-    repository = PostRepository(db)
-    post = repository.get(post_id)
+async def delete_post(post_id:int, db: AsyncSession = Depends(get_async_db),user = Depends(get_current_principal)): 
+    repository = AsyncPostRepository(db)
+    post = await repository.get(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post no encontrado")
+    moved = []
     try:     
-        repository.delete_post(post)
-        db.commit()
-        return {"message": "Post eliminado exitosamente"}   
+        released = await repository.delete_post(post)
+        if released:
+            moved = await run_in_threadpool(detach_blob_files, released)
+        await db.commit()
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
+        if moved:
+            await run_in_threadpool(restore_blob_files, moved)
         raise HTTPException(status_code=500, detail="Error al eliminar el post")
+    if moved:
+        await run_in_threadpool(purge_blob_files, moved)
+    return {"message": "Post eliminado exitosamente"}   
     
 
 @router.get("/post/{slug}", response_model=Union[PostPublic, PostSummary])
-def get_by_slug(
+async def get_by_slug(
+    response: Response,
     slug: str,
     include_content: bool = Query(default=True, description="Incluir el contenido del post"),
-    db: Session = Depends(get_db)):
-    repository = PostRepository(db)
-    post = repository.get_by_slug(slug)
+    fields: Optional[str] = Query(default=None, description="Campos a devolver separados por comas"),
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncPostRepository(db)
+    selected = parse_fields(fields)
+    representation = "full" if include_content else "summary"
+    etag_representation = fields_representation(selected) if selected else representation
+    
+    if if_none_match:
+        current = await repository.get_version_by_slug(slug)
+        if not current:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post no encontrado")
+        etag = post_etag(current.id, current.version, current.created_at, etag_representation)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    post = await repository.get_by_slug(slug, shape=representation, fields=selected)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post no encontrado")
+    
+    response.headers["ETag"] = post_etag(post.id, post.version, post.created_at, etag_representation)
+    response.headers["Cache-Control"] = "no-cache"
+    
+    if selected is not None:
+        return JSONResponse(content=jsonable_encoder(serialize_fields(post, selected)), headers=dict(response.headers))
+    
+    if settings.SERIALIZATION_MODE == "fast":
+        data = PostSerializer().post(post) if include_content else summary(post)
+        return json_response(data, headers=dict(response.headers))
+    
     if include_content:
         return PostPublic.model_validate(post, from_attributes=True)
     
@@ -206,7 +402,7 @@ def get_by_slug(
 
 
 @router.get("/secure")
-def secure_endpoint(token:str = Depends(oauth2_scheme)):
+async def secure_endpoint(token:str = Depends(oauth2_scheme)):
     return {"message":"acceso con token", "token recibido":token}
     
 
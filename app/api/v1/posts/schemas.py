@@ -1,6 +1,6 @@
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator,EmailStr
-from typing import Optional, List, Annotated
+from typing import Literal, Optional, List, Annotated
 from fastapi import Form
 
 from app.api.v1.auth.schemas import UserPublic
@@ -15,12 +15,20 @@ class Author(BaseModel):
     email: Optional[EmailStr] = Field(None, description="Correo electrónico del autor")
     model_config = ConfigDict(from_attributes=True)
 
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    content_type: str
+    url: str
+
 class PostBase(BaseModel):
     title: str
     content: str
     tags: Optional[List[Tag]] = Field(default_factory=list) # lista vacía por defecto
     user: Optional[UserPublic] = None
     image_url: Optional[str] = None
+    # None hasta que terminan de generarse los derivados de la imagen
+    image_variants: Optional[List[ImageVariant]] = None
     category: Optional[CategoryPublic] = None
     
     model_config = ConfigDict(from_attributes=True)
@@ -63,6 +71,18 @@ class PostCreate(BaseModel):
         tag_objs = [Tag(name=t) for t in tags or []]
         return cls(title=title, content=content,category_id=category_id, tags = tag_objs)
 
+class PostBulkItem(PostCreate):
+    # misma validación que PostCreate; las tags llegan como nombres planos
+    tags: List[str] = Field(default_factory=list)
+    image_url: Optional[str] = Field(default=None, max_length=300)
+
+class PostBulkResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    items: List[dict]
+    errors: List[dict]
+
 class PostUpdate(BaseModel):
     title: Optional[str] = Field(None, description="Título del post", max_length=100, min_length=1)
     content: Optional[str] = None
@@ -79,16 +99,19 @@ class PostSummary(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
 class PaginatedPost(BaseModel):
-    page:int
+    page: Optional[int]
     per_page:int
-    total: int
-    total_pages: int
+    total: Optional[int]
+    total_pages: Optional[int]
     has_prev: bool
     has_next: bool
     order_by: str
     direction: str
     search: Optional[str]
     limit: int
-    offset: int
+    offset: Optional[int]
     items: List[PostPublic]
+    pagination: Literal["offset", "cursor"] = "offset"
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
@@ -0,0 +1,84 @@
+# Serialización rápida de posts: dicts en el orden de campos de los schemas, directamente desde
+# los objetos ya cargados, y JSON en bytes sin la segunda validación de response_model.
+# La salida es idéntica byte a byte a la de FastAPI/pydantic (lo comprueba el modo "pydantic").
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from app.api.v1.auth.schemas import UserPublic
+from app.api.v1.categories.schemas import CategoryPublic
+from .schemas import PaginatedPost
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAGINATED_FIELDS = [(name, field.default) for name, field in PaginatedPost.model_fields.items()]
+
+
+def dumps(data: Any) -> bytes:
+    # orjson y pydantic-core escriben el mismo JSON compacto en UTF-8 para estos tipos
+    return orjson.dumps(data) if orjson is not None else to_json(data)
+
+
+class PostSerializer:
+    # Autor y categoría pasan por su schema (EmailStr normaliza el email), pero una sola vez
+    # por objeto distinto en la respuesta; las columnas del post se copian tal cual
+    def __init__(self):
+        self._users: Dict[int, dict] = {}
+        self._categories: Dict[int, dict] = {}
+
+    def _user(self, user) -> Optional[dict]:
+        if user is None:
+            return None
+        data = self._users.get(user.id)
+        if data is None:
+            data = self._users[user.id] = UserPublic.model_validate(user).model_dump(mode="json")
+        return data
+
+    def _category(self, category) -> Optional[dict]:
+        if category is None:
+            return None
+        data = self._categories.get(category.id)
+        if data is None:
+            data = self._categories[category.id] = CategoryPublic.model_validate(category).model_dump(mode="json")
+        return data
+
+    def post(self, post) -> dict:
+        # mismo orden de claves que PostPublic (PostBase primero, luego id y slug)
+        variants = post.image_variants
+        return {
+            "title": post.title,
+            "content": post.content,
+            "tags": [{"name": tag.name} for tag in post.tags],
+            "user": self._user(post.user),
+            "image_url": post.image_url,
+            "image_variants": [
+                {"width": v["width"], "height": v["height"], "content_type": v["content_type"], "url": v["url"]}
+                for v in variants
+            ] if variants is not None else None,
+            "category": self._category(post.category),
+            "id": post.id,
+            "slug": post.slug,
+        }
+
+    def posts(self, posts: Iterable) -> List[dict]:
+        return [self.post(post) for post in posts]
+
+
+def summary(post) -> dict:
+    return {"id": post.id, "title": post.title}
+
+
+def paginated(meta: dict, items: List[dict]) -> dict:
+    data = {}
+    for name, default in PAGINATED_FIELDS:
+        data[name] = items if name == "items" else meta.get(name, default)
+    return data
+
+
+def json_response(data: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    return Response(content=dumps(data), status_code=status_code, headers=headers, media_type="application/json")
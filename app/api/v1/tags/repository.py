@@ -6,15 +6,21 @@ from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.api.v1.tags.schemas import TagPublic
+from app.core.db import AsyncRepository
 from app.models.post import PostORM, post_tags
 from app.models.tag import TagORM
-from app.services.pagination import paginate_query
+from app.services.etag import bump_post_versions
+from app.services.tag_cache import bump_tag_generation, forget_tag, normalize_tag, remember_tags, sync_tag_cache, tag_cache
+from app.services.pagination import CountStrategy, mark_counts_dirty, normalize_filter, paginate_query
 from fastapi import HTTPException, status
 
 class TagRepository:
     def __init__(self, db:Session):
         self.db = db
         
+    def _tagged_posts(self, tag_id:int):
+        return PostORM.id.in_(select(post_tags.c.post_id).where(post_tags.c.tag_id == tag_id))
+        
     def get(self,tag_id:int) -> TagORM:
         tag_find = select(TagORM).where(TagORM.id == tag_id)
         return self.db.execute(tag_find).scalar_one_or_none()
@@ -25,10 +31,13 @@ class TagRepository:
         order_by:str = "id",
         direction:str = "asc",
         page:int = 1,
-        per_page:int = 10) :
+        per_page:int = 10,
+        count_strategy:CountStrategy = "exact") :
         query = select(TagORM)
+        # misma normalización que la clave de la caché de totales
+        search = " ".join(search.lower().split()) if search else None
         if search:
-            query = query.where(func.lower(TagORM.name).ilike(f"%{search.lower()}%"))
+            query = query.where(func.lower(TagORM.name).ilike(f"%{search}%"))
         
         allowed_order = {
             "id": TagORM.id,
@@ -43,25 +52,38 @@ class TagRepository:
             per_page=per_page,
             order_by =order_by,
             direction=direction,
-            allowed_order=allowed_order
-            
+            allowed_order=allowed_order,
+            count_strategy=count_strategy,
+            count_scope="tags",
+            count_key=normalize_filter(search=search)
         )
         
         result["items"] = [TagPublic.model_validate(item) for item in result["items"]]
         return result
     
     def create_tag(self, tag_name:str):
-        normalize = tag_name.strip().lower()
+        normalize = normalize_tag(tag_name)
+        sync_tag_cache(self.db)
+        cached_id = tag_cache.get(normalize)
+        if cached_id is not None:
+            tag_obj = self.db.get(TagORM, cached_id)
+            if tag_obj:
+                return tag_obj
+            forget_tag(self.db, normalize)
+        
         tag_obj = self.db.execute(
             select(TagORM).where(func.lower(TagORM.name) == normalize)
         ).scalar_one_or_none()
         
         if tag_obj:
+            remember_tags(self.db, {normalize: tag_obj.id})
             return tag_obj
         
         tag_obj = TagORM(name=tag_name)
         self.db.add(tag_obj)
         self.db.flush()
+        mark_counts_dirty(self.db, "tags")
+        remember_tags(self.db, {normalize: tag_obj.id})
         return tag_obj
     
     def update_tag(self, tag_id:int, name: str) -> Optional[TagORM]:
@@ -69,9 +91,14 @@ class TagRepository:
         if not tag:
             return None
         if name is not None:
+            forget_tag(self.db, tag.name)
+            bump_tag_generation(self.db)
             tag.name = name.strip().lower()
+            remember_tags(self.db, {tag.name: tag.id})
+            bump_post_versions(self.db, self._tagged_posts(tag_id))
         self.db.add(tag)
         self.db.flush()
+        mark_counts_dirty(self.db, "tags")
         self.db.refresh(tag)
         return tag
    
@@ -79,7 +106,11 @@ class TagRepository:
         tag = self.get(tag_id)
         if not tag:
             return False
+        bump_post_versions(self.db, self._tagged_posts(tag_id))
+        forget_tag(self.db, tag.name)
+        bump_tag_generation(self.db)
         self.db.delete(tag)
+        mark_counts_dirty(self.db, "tags")
         return True
 
     def most_popular(self) -> dict | None:
@@ -101,6 +132,25 @@ class TagRepository:
         )
         
         return dict(row) if row else None
+
+
+class AsyncTagRepository(AsyncRepository):
+    sync_repository = TagRepository
+    
+    async def get(self, tag_id:int) -> TagORM:
+        return await self._run("get", tag_id)
+    
+    async def list_tags(self, **kwargs):
+        return await self._run("list_tags", **kwargs)
+    
+    async def create_tag(self, tag_name:str):
+        return await self._run("create_tag", tag_name)
+    
+    async def update_tag(self, tag_id:int, name:str) -> Optional[TagORM]:
+        return await self._run("update_tag", tag_id, name)
     
+    async def delete_tag(self, tag_id:int) -> bool:
+        return await self._run("delete_tag", tag_id)
     
-    
\ No newline at end of file
+    async def most_popular(self) -> dict | None:
+        return await self._run("most_popular")
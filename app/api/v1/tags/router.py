@@ -1,82 +1,92 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.api.v1.tags.repository import TagRepository
+from app.api.v1.tags.repository import AsyncTagRepository
 from app.api.v1.tags.schemas import TagCreate, TagPublic, TagUpdate
-from app.core.db import get_db
-from sqlalchemy.orm import Session
+from app.core.db import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from app.core.security import get_current_user, require_admin, require_editor, require_user
-from app.models.user import UserORM
+from app.services.principal_cache import Principal
+from app.core.config import settings
+from app.services.pagination import CountStrategy
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
 
 @router.get("",response_model=dict)
-def list_tags(
+async def list_tags(
     page: int = Query(1, ge=1),
     per_page:int =Query(10,ge = 1, le = 100),
     order_by: str = Query("id", pattern="^(id|name)$"),
     direction: str = Query("asc",pattern="^(asc|desc)$"),
     search: str | None = Query(None),
-    db:Session = Depends(get_db)
+    count: CountStrategy | None = Query(None, description="Cómo calcular el total: exact, cached, estimated o none"),
+    db:AsyncSession = Depends(get_async_db)
 ):
-    repository = TagRepository(db)
-    return repository.list_tags(page = page,per_page=per_page,order_by=order_by,direction=direction,search=search)
+    repository = AsyncTagRepository(db)
+    return await repository.list_tags(
+        page = page,
+        per_page=per_page,
+        order_by=order_by,
+        direction=direction,
+        search=search,
+        count_strategy=count or settings.PAGINATION_COUNT_STRATEGY
+    )
 
 
 @router.post("",response_model=TagPublic, response_description="post creado", status_code=status.HTTP_201_CREATED)
-def create_tag(tag:TagCreate, db:Session = Depends(get_db), _editor: UserORM = Depends(require_editor)):
-    repository = TagRepository(db)
+async def create_tag(tag:TagCreate, db:AsyncSession = Depends(get_async_db), _editor: Principal = Depends(require_editor)):
+    repository = AsyncTagRepository(db)
     try:
-        tag_created = repository.create_tag(tag_name = tag.name)
-        db.commit()
-        db.refresh(tag_created)
+        tag_created = await repository.create_tag(tag_name = tag.name)
+        await db.commit()
+        await db.refresh(tag_created)
         return tag_created
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="error al crear tag")
     
 @router.put("/{tag_id}",response_model=TagPublic, response_description="actualizar tag", status_code=status.HTTP_202_ACCEPTED)
-def update_tag(tag_id:int, data:TagUpdate, db:Session = Depends(get_db),  _editor: UserORM = Depends(require_editor)):
-    repository = TagRepository(db)
-    tag = repository.get(tag_id)
+async def update_tag(tag_id:int, data:TagUpdate, db:AsyncSession = Depends(get_async_db),  _editor: Principal = Depends(require_editor)):
+    repository = AsyncTagRepository(db)
+    tag = await repository.get(tag_id)
     
     if not tag:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag no encontrado") 
     try:
         updates = data.model_dump(exclude_unset=True) 
         print(f"updates = {updates}" )
-        tag = repository.update_tag(tag_id, updates["name"])
-        db.commit()
-        db.refresh(tag)
+        tag = await repository.update_tag(tag_id, updates["name"])
+        await db.commit()
+        await db.refresh(tag)
         return tag
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Error al actualizar el tag")
 
 
 @router.delete("/{tag_id}", status_code=status.HTTP_202_ACCEPTED, response_description="Tag eliminado exitosamente")
-def delete_tag(tag_id:int, db: Session = Depends(get_db), _admin: UserORM = Depends(require_admin)): 
-    repository = TagRepository(db)
-    tag = repository.get(tag_id)
+async def delete_tag(tag_id:int, db: AsyncSession = Depends(get_async_db), _admin: Principal = Depends(require_admin)): 
+    repository = AsyncTagRepository(db)
+    tag = await repository.get(tag_id)
     if not tag:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag no encontrado")
     try:     
-        repository.delete_tag(tag_id)
-        db.commit()
+        await repository.delete_tag(tag_id)
+        await db.commit()
         return {"message": "Tag eliminado exitosamente"}   
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Error al eliminar el Tag")
     
 @router.get("/popular/top")
-def get_most_popular_tag(
-    db:Session = Depends(get_db),
-    _user: UserORM = Depends(require_user)
+async def get_most_popular_tag(
+    db:AsyncSession = Depends(get_async_db),
+    _user: Principal = Depends(require_user)
 ):
-    repository = TagRepository(db)
-    row = repository.most_popular()
+    repository = AsyncTagRepository(db)
+    row = await repository.most_popular()
     if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no hay tags en uso")
     return row
\ No newline at end of file
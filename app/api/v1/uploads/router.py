@@ -1,4 +1,5 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 import os
 import shutil
 import uuid
@@ -25,7 +26,7 @@ async def upload_file(file: UploadFile=File(...)):
     
 @router.post("/save")
 async def save_file(file: UploadFile):
-    saved = save_uploaded_file(file)
+    saved = await run_in_threadpool(save_uploaded_file, file)
 
     return {
         "filename": saved["filename"],
@@ -5,4 +5,56 @@ import os
 class settings():
     JWT_SECRET: str = os.getenv("SECRET_KEY", "change-me-in-prod")
     JWT_ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES","30"))
\ No newline at end of file
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES","30"))
+    PAGINATION_COUNT_STRATEGY: str = os.getenv("PAGINATION_COUNT_STRATEGY", "exact")
+    COUNT_CACHE_TTL_SECONDS: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+    BULK_MAX_CHUNK_SIZE: int = int(os.getenv("BULK_MAX_CHUNK_SIZE", "5000"))
+    TAG_CACHE_MAX_SIZE: int = int(os.getenv("TAG_CACHE_MAX_SIZE", "10000"))
+    TAG_CACHE_TTL_SECONDS: float = float(os.getenv("TAG_CACHE_TTL_SECONDS", "300"))
+    PRINCIPAL_CACHE_MAX_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE_LIMIT: int = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+    PASSWORD_HASH_RETRY_AFTER: int = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+    # el rol viaja firmado en el JWT: las comprobaciones de rol no tocan la BD (salvo tokens anteriores
+    # al último cambio de rol o de alta del usuario, y la recarga periódica de esos cambios)
+    JWT_ROLE_CLAIM: bool = os.getenv("JWT_ROLE_CLAIM", "false").lower() in ("1", "true", "yes")
+    # None -> stdout; con ruta, fichero rotado por tamaño
+    ACCESS_LOG_PATH: str | None = os.getenv("ACCESS_LOG_PATH") or None
+    ACCESS_LOG_QUEUE_SIZE: int = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+    ACCESS_LOG_SAMPLE_RATE: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+    ACCESS_LOG_ROUTE_SAMPLE_RATES: str = os.getenv("ACCESS_LOG_ROUTE_SAMPLE_RATES", "")
+    ACCESS_LOG_MAX_BYTES: int = int(os.getenv("ACCESS_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    ACCESS_LOG_BACKUP_COUNT: int = int(os.getenv("ACCESS_LOG_BACKUP_COUNT", "5"))
+    # N+1: misma sentencia repetida al menos estas veces en una petición perfilada
+    SQL_PROFILE_REPEAT_THRESHOLD: int = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "3"))
+    SQL_PROFILE_MAX_REPORTS: int = int(os.getenv("SQL_PROFILE_MAX_REPORTS", "100"))
+    MAX_UPLOAD_MB: int = int(os.getenv("MAX_UPLOAD_MB", "3"))
+    # margen para los campos del formulario y los delimitadores multipart sobre el tamaño del archivo
+    UPLOAD_FORM_OVERHEAD_BYTES: int = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", str(64 * 1024)))
+    IMAGE_VARIANT_WIDTHS: str = os.getenv("IMAGE_VARIANT_WIDTHS", "320,800,1600")
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_QUEUE_LIMIT: int = int(os.getenv("IMAGE_QUEUE_LIMIT", "32"))
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    # /media: los nombres no se reutilizan, así que la caché del cliente puede ser permanente
+    MEDIA_CACHE_MAX_AGE: int = int(os.getenv("MEDIA_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+    # p. ej. /_media: nginx sirve el archivo desde esa location interna (X-Accel-Redirect)
+    MEDIA_ACCEL_REDIRECT_PREFIX: str | None = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX") or None
+    # respuestas más pequeñas que esto (en bytes) se envían sin comprimir
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_ENCODINGS: str = os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip")
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    # fast: respuestas de posts serializadas directamente a bytes; pydantic: model_validate + response_model
+    SERIALIZATION_MODE: str = os.getenv("SERIALIZATION_MODE", "fast")
@@ -1,7 +1,14 @@
 import os
 from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.pool_stats import PoolStats, attach_pool_events, instrumented_pool_class
+from app.services.metrics import attach_sql_metrics
+from app.services.sql_profiler import attach_sql_profiler
 
 # arrel del paquet "app"
 APP_DIR = Path(__file__).resolve().parent  # .../FastApi_arquitecture/app
@@ -13,10 +20,57 @@ engine_kwargs = {}
 if DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, echo=False, future=True, **engine_kwargs)
+engine_kwargs["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+engine_kwargs["pool_recycle"] = settings.DB_POOL_RECYCLE
+
+# SQLite en memoria usa su propio pool (una conexión); el resto va con QueuePool configurable
+USE_QUEUE_POOL = ":memory:" not in DATABASE_URL and "mode=memory" not in DATABASE_URL
+if USE_QUEUE_POOL:
+    engine_kwargs["pool_size"] = settings.DB_POOL_SIZE
+    engine_kwargs["max_overflow"] = settings.DB_MAX_OVERFLOW
+    engine_kwargs["pool_timeout"] = settings.DB_POOL_TIMEOUT
+
+pool_stats = {"sync": PoolStats("sync"), "async": PoolStats("async")}
+
+engine = create_engine(
+    DATABASE_URL, echo=False, future=True,
+    **({"poolclass": instrumented_pool_class(QueuePool, pool_stats["sync"])} if USE_QUEUE_POOL else {}),
+    **engine_kwargs
+)
+
+attach_pool_events(engine, pool_stats["sync"])
+attach_sql_metrics(engine)
+attach_sql_profiler(engine)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, class_=Session)
 
+
+def to_async_url(url: str) -> str:
+    # mismo destino que DATABASE_URL pero con driver asíncrono
+    if url.startswith("sqlite+aiosqlite") or "+asyncpg" in url or url.startswith("postgresql+psycopg:"):
+        return url
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite" + url[len("sqlite"):]
+    for prefix in ("postgresql+psycopg2", "postgresql", "postgres"):
+        if url.startswith(prefix + ":"):
+            return "postgresql+psycopg" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, echo=False,
+    **({"poolclass": instrumented_pool_class(AsyncAdaptedQueuePool, pool_stats["async"])} if USE_QUEUE_POOL else {}),
+    **engine_kwargs
+)
+
+attach_pool_events(async_engine.sync_engine, pool_stats["async"])
+attach_sql_metrics(async_engine.sync_engine)
+attach_sql_profiler(async_engine.sync_engine)
+
+# expire_on_commit=False: tras el commit no se puede hacer lazy load fuera del greenlet
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
 class Base(DeclarativeBase):
     pass
 
@@ -26,3 +80,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def pool_report() -> dict:
+    return {
+        "sync": pool_stats["sync"].snapshot(engine.pool),
+        "async": pool_stats["async"].snapshot(async_engine.pool),
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        },
+    }
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class AsyncRepository:
+    # Ejecuta la lógica del repositorio síncrono dentro del greenlet de AsyncSession (driver async, sin hilos)
+    sync_repository: type
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method: str, *args, **kwargs):
+        return await self.db.run_sync(
+            lambda session: getattr(self.sync_repository(session), method)(*args, **kwargs)
+        )
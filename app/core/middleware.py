@@ -1,10 +1,215 @@
 from time import perf_counter
 import uuid
-from fastapi import FastAPI, HTTPException, Request
+from typing import Optional
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.access_log import access_logger, access_record
+from app.services.compression import ENCODERS, is_compressible, negotiate
+from app.services.file_storage import MAX_BYTES, upload_too_large
+from app.core.db import AsyncSessionLocal
+from app.core.security import resolve_principal
+from app.services.metrics import NO_ROUTE, metrics, request_sql
+from app.services.sql_profiler import SqlProfile, current_profile, profile_mode, profile_store
+
+BLOCKED_IPS = {"192.168.1.100"}
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _is_admin(scope: Scope) -> bool:
+    # solo se consulta si llega X-Debug-SQL; el token se valida igual que en require_admin
+    scheme, _, token = (_header(scope, b"authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        async with AsyncSessionLocal() as db:
+            principal = await resolve_principal(db, token)
+    except HTTPException:
+        return False
+    return principal.role == "admin"
+
+
+def _limited_receive(receive: Receive, limit: int) -> Receive:
+    # cuerpos sin Content-Length (chunked): se corta en cuanto se pasa del límite, mientras se lee
+    received = 0
+
+    async def wrapper() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise upload_too_large()
+        return message
+
+    return wrapper
+
+
+class RequestContextMiddleware:
+    # Un único middleware ASGI puro: bloqueo por IP, request id, tiempo y log en una sola pasada.
+    # Las cabeceras se añaden en http.response.start, así que las respuestas en streaming no se tocan
+    def __init__(self, app: ASGIApp, blocked_ips=BLOCKED_IPS, max_upload_bytes: int = MAX_BYTES + settings.UPLOAD_FORM_OVERHEAD_BYTES):
+        self.app = app
+        self.blocked_ips = frozenset(blocked_ips)
+        self.max_upload_bytes = max_upload_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        if client and client[0] in self.blocked_ips:
+            response = JSONResponse({"detail": "Access forbidden from your IP address."}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        start = perf_counter()
+        request_id = str(uuid.uuid4())
+        # disponible en request.state.request_id para el resto de la app
+        scope.setdefault("state", {})["request_id"] = request_id
+        status_code = 500
+        response_bytes = 0
+        metrics.in_flight += 1
+        sql = [0, 0.0]
+        sql_token = request_sql.set(sql)
+        profile = None
+        debug = _header(scope, b"x-debug-sql")
+        mode = profile_mode(debug) if debug else None
+        if mode and await _is_admin(scope):
+            profile = SqlProfile(request_id, scope["method"], scope["path"], mode)
+            profile_token = current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(perf_counter() - start)
+                headers["X-Request-ID"] = request_id
+                if profile is not None:
+                    # resumen aquí; el informe completo en /admin/sql-profiles/{request_id}
+                    headers["X-SQL-Profile"] = profile.summary_header()
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        app = self.app
+        # subidas multipart: un Content-Length excesivo se rechaza antes de leer el cuerpo
+        if (_header(scope, b"content-type") or "").startswith("multipart/form-data"):
+            length = _header(scope, b"content-length")
+            if length is not None and length.isdigit() and int(length) > self.max_upload_bytes:
+                app = JSONResponse({"detail": upload_too_large().detail}, status_code=413)
+            else:
+                receive = _limited_receive(receive, self.max_upload_bytes)
+
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            duration = perf_counter() - start
+            metrics.in_flight -= 1
+            request_sql.reset(sql_token)
+            if profile is not None:
+                current_profile.reset(profile_token)
+                profile_store.save(profile)
+            # plantilla de la ruta (no el path) para no disparar la cardinalidad
+            route = getattr(scope.get("route"), "path", None) or NO_ROUTE
+            metrics.observe_request(scope["method"], route, status_code, duration, sql)
+            # una línea JSON por petición, escrita en segundo plano
+            access_logger.log(access_record(scope, request_id, status_code, duration, response_bytes))
+
+
+class CompressionMiddleware:
+    # gzip/br/zstd según Accept-Encoding. Respuestas completas por debajo del umbral van tal cual;
+    # las respuestas en streaming se comprimen trozo a trozo con flush, sin acumularlas
+    def __init__(self, app: ASGIApp, minimum_size: int = settings.COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def _applies(self, scope: Scope, message: Message) -> bool:
+        status_code = message["status"]
+        if status_code < 200 or status_code in (204, 304):
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        if not is_compressible(headers.get("content-type")):
+            return False
+        length = headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) < self.minimum_size:
+            return False
+        # la ruta ya está resuelta cuando empieza la respuesta
+        endpoint = getattr(scope.get("route"), "endpoint", None)
+        return not getattr(endpoint, "no_compression", False)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = negotiate(_header(scope, b"accept-encoding")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                if self._applies(scope, message):
+                    # se retiene hasta ver el primer trozo del cuerpo
+                    start_message = message
+                    return
+                passthrough = True
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # otra representación: el ETag pasa a débil (If-None-Match compara en débil)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if not more_body:
+                    data = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(data))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start_message)
+
+            data = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
 
 def register_middleware(app: FastAPI):
-    
+    # el más interno: lo que mide RequestContextMiddleware son los bytes ya comprimidos
+    app.add_middleware(CompressionMiddleware)
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -12,39 +217,6 @@ def register_middleware(app: FastAPI):
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    
-    
-    @app.middleware("http")
-    async def add_process_time_header(request: Request, call_next):
-        start = perf_counter()
-        response = await call_next(request)
-        process_time = perf_counter() - start
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
-    
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        
-        method = request.method
-        url = request.url
-        print(f"ENTRADA: {request.method} {request.url}")
-        response = await call_next(request)
-        print(f"SALIDA: {method} {url} - {response.status_code}")
-        return response
-    
-    @app.middleware("http")
-    async def add_request_id_header(request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        return response
-    
-    @app.middleware("http")
-    async def block_ip_middleware(request: Request, call_next):
-        blocked_ips = {"192.168.1.100"}
-        client_ip = request.client.host
-        if client_ip in blocked_ips:
-            raise HTTPException(status_code=403, detail="Access forbidden from your IP address.")
-        return await call_next(request)
-    
-    
+
+    # el último añadido es el más externo: bloquea antes de CORS, igual que antes
+    app.add_middleware(RequestContextMiddleware)
@@ -0,0 +1,95 @@
+
+# Instrumentación del pool de conexiones: checkouts, espera, overflow e invalidaciones
+
+import threading
+from time import perf_counter
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.overflow_checkouts = 0
+        self.overflow_peak = 0
+
+    def record_wait(self, pool: Pool, seconds: float) -> None:
+        overflow = max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0
+        with self._lock:
+            self.checkout_wait_total += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: Pool) -> dict:
+        with self._lock:
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "checkout_wait_total_s": round(self.checkout_wait_total, 6),
+                "checkout_wait_avg_s": round(self.checkout_wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "checkout_wait_max_s": round(self.checkout_wait_max, 6),
+                "overflow_checkouts": self.overflow_checkouts,
+                "overflow_peak": self.overflow_peak,
+            }
+        # estado en vivo del pool (QueuePool y derivados)
+        for key in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, key, None)
+            if callable(method):
+                data[key] = method()
+        # QueuePool.overflow() es negativo mientras el pool base no está lleno
+        if "overflow" in data:
+            data["overflow_in_use"] = max(data["overflow"], 0)
+        data["status"] = pool.status()
+        return data
+
+
+def instrumented_pool_class(base: type[Pool], stats: PoolStats) -> type[Pool]:
+    # Ningún evento del pool marca el inicio de la espera: se mide alrededor de _do_get.
+    # engine.dispose() recrea el pool con la misma clase y conserva la medición.
+    def _do_get(self):
+        start = perf_counter()
+        connection = base._do_get(self)
+        stats.record_wait(self, perf_counter() - start)
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def attach_pool_events(engine, stats: PoolStats) -> None:
+    # Escuchar en el engine (no en el pool) sobrevive a engine.dispose()
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.incr("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.incr("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.incr("invalidations")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        stats.incr("soft_invalidations")
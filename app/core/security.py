@@ -1,19 +1,20 @@
 import os
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta, timezone
-from typing import Literal, Optional
+from typing import Literal, Optional, Tuple
 from jose import JWTError
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, PyJWTError
 from fastapi import Depends, HTTPException, status
-from pwdlib import PasswordHash
-from app.api.v1.auth.repository import UserRepository
+from app.api.v1.auth.repository import AsyncUserRepository
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.models.user import UserORM
-from sqlalchemy.orm import Session
-
-password_hash = PasswordHash.recommended()
+from app.models.user_auth_epoch import UserAuthEpochORM
+from app.services.password_hashing import password_hasher
+from app.services.principal_cache import Principal, auth_epochs, principal_cache, principal_of
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
@@ -52,67 +53,115 @@ def invalid_credentials():
 #     to_encode.update({"exp":expire})
 #     token = jwt.encode(payload = to_encode, key=settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 #     return token
-def create_access_token(sub:str, minutes: int | None = None) -> str :
-    expire = datetime.now(tz=timezone.utc) + timedelta(minutes = minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return jwt.encode({"sub":sub, "exp": expire}, key=settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+def create_access_token(sub:str, minutes: int | None = None, role: str | None = None) -> str :
+    now = datetime.now(tz=timezone.utc)
+    expire = now + timedelta(minutes = minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {"sub":sub, "exp": expire, "iat": now}
+    if settings.JWT_ROLE_CLAIM and role:
+        claims["role"] = role
+    return jwt.encode(claims, key=settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 def decode_token(token: str) -> dict:
-    payload = jwt.decode(jwt = token, key=settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-    print("payload1 = ", payload)
-    return payload
+    return jwt.decode(jwt = token, key=settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
 
-def get_current_user(db:Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> UserORM:
-    
+def token_claims(token: str) -> Tuple[int, dict]:
     try:
         payload = decode_token(token)
-        print("payload = ", payload)
         sub: Optional[str] = payload.get("sub")
         if not sub:
             raise credentials_exc
-        user_id = int(sub)
+        return int(sub), payload
         
     except ExpiredSignatureError:
-        raise_expired_token()
+        raise raise_expired_token()
         
     except InvalidTokenError:
         raise credentials_exc
     except PyJWTError:
         raise invalid_credentials()
-        
-    user = db.get(UserORM, user_id)
-    if not user or not user.is_active:
+    except ValueError:
+        raise credentials_exc
+
+async def get_current_user(db:AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> UserORM:
+    # usuario completo (para /me o para firmar un post); de paso refresca la caché de principals
+    user_id, _ = token_claims(token)
+    generation = principal_cache.generation
+    user = await db.get(UserORM, user_id)
+    if not user:
+        raise credentials_exc
+    principal_cache.put(user.id, principal_of(user), generation)
+    if not user.is_active:
         raise credentials_exc
    
     return user
+
+async def get_current_principal(db:AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    return await resolve_principal(db, token)
+
+async def resolve_principal(db:AsyncSession, token:str) -> Principal:
+    # id, rol y activo: de la caché, del propio token (JWT_ROLE_CLAIM) o, si no, una consulta de columnas.
+    # La sesión no abre conexión hasta la primera consulta, así que un acierto no toca el pool
+    user_id, payload = token_claims(token)
+    principal = principal_cache.get(user_id)
+    if principal is None and settings.JWT_ROLE_CLAIM and payload.get("role") in ROLE_ORDER:
+        # el rol firmado solo vale si el token es posterior al último cambio de rol o de alta del usuario
+        if auth_epochs.needs_reload():
+            auth_epochs.load((await db.execute(select(UserAuthEpochORM.user_id, UserAuthEpochORM.changed_at))).all())
+        if auth_epochs.token_is_current(user_id, payload.get("iat")):
+            principal = Principal(id=user_id, role=payload["role"])
+    if principal is None:
+        generation = principal_cache.generation
+        row = (await db.execute(
+            select(UserORM.id, UserORM.role, UserORM.is_active).where(UserORM.id == user_id)
+        )).one_or_none()
+        if row is None:
+            raise credentials_exc
+        principal = Principal(id=row.id, role=row.role, is_active=bool(row.is_active))
+        principal_cache.put(user_id, principal, generation)
+    if not principal.is_active:
+        raise credentials_exc
+    return principal
     
     
-def hash_password(plain:str) -> str:
-    return password_hash.hash(plain)
+async def authenticate(db:AsyncSession, email:str, password:str) -> Optional[UserORM]:
+    # argon2 es CPU: siempre en el pool de hashing, nunca en el event loop. La sesión se cierra
+    # antes de esperar al pool para no retener la conexión durante el hash (el usuario queda
+    # desligado con sus columnas cargadas; expire_on_commit=False)
+    repository = AsyncUserRepository(db)
+    user = await repository.get_by_email(email)
+    await db.close()
+    if not user:
+        return None
+    valid, new_hash = await password_hasher.verify(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        # parámetros de argon2 cambiados: se guarda el hash nuevo aprovechando la contraseña en claro
+        await repository.update_password_hash(user, new_hash)
+        await db.commit()
+    return user
 
-def verify_password(plain:str, hashed:str) -> bool:
-    return password_hash.verify(plain,hashed)
+ROLE_ORDER = {
+    "user":0,
+    "editor":1,
+    "admin":2
+}
 
 def require_role(min_role:Literal["user","editor", "admin"]):
-    order= {
-        "user":0,
-        "editor":1,
-        "admin":2
-    }
 
-    def evaluation(user:UserORM = Depends(get_current_user)) -> UserORM:
-        if order[user.role] < order[min_role]:
+    async def evaluation(principal:Principal = Depends(get_current_principal)) -> Principal:
+        if ROLE_ORDER[principal.role] < ROLE_ORDER[min_role]:
             raise raise_forbidden()
-        return user
+        return principal
     
     return evaluation
 
 
-async def oauth2_token(form:OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    repository = UserRepository(db)
-    user = repository.get_by_email(form.username)
-    if not user or not verify_password(form.password, user.hashed_password):
+async def oauth2_token(form:OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate(db, form.username, form.password)
+    if not user:
         raise invalid_credentials()
-    token = create_access_token(sub = str(user.id))
+    token = create_access_token(sub = str(user.id), role = user.role)
     return {"access_token": token, "token_type": "bearer"}
     
         
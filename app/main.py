@@ -1,33 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
-from app.core.db import Base, engine
+from app.core.db import Base, SessionLocal, engine
 from app.api.v1.posts.router import router as post_router
 from app.api.v1.auth.router import router as auth_router
 from app.api.v1.uploads.router import router as upload_router
 from app.api.v1.tags.router import router as tag_router
 from app.api.v1.categories.router import router as category_router
-from fastapi.staticfiles import StaticFiles
+from app.api.v1.admin.router import router as admin_router
+from app.api.v1.metrics.router import router as metrics_router
 from pathlib import Path
 import os
 
 from app.core.middleware import register_middleware
+from app.services.post_search import ensure_search_index
+from app.services.access_log import access_logger
+from app.services.image_variants import image_pipeline
+from app.services.media_files import MediaFiles
+from app.services.password_hashing import password_hasher
+from app.services.tag_cache import warm_tag_cache
 
 
 load_dotenv()
 MEDIA_DIR = Path("app") / "media"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+    access_logger.shutdown()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Mini Blog")
+    app = FastAPI(title="Mini Blog", lifespan=lifespan)
     Base.metadata.create_all(bind=engine) # dev --> crea las tablas
+    ensure_search_index(engine)
+    with SessionLocal() as db:
+        warm_tag_cache(db)
     register_middleware(app)
     app.include_router(auth_router, prefix="/api/v1")
     app.include_router(post_router)
     app.include_router(upload_router)
     app.include_router(tag_router)
     app.include_router(category_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
     os.makedirs(MEDIA_DIR, exist_ok=True)
-    app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+    app.mount("/media", MediaFiles(directory=MEDIA_DIR), name="media")
     
     return app
 
@@ -1,7 +1,11 @@
+from .cache_generation import CacheGenerationORM
 from .category import CategoryORM
+from .media_blob import MediaBlobORM
 from .post import PostORM
+from .slug_counter import SlugCounterORM
 from .tag import TagORM, post_tags
 from .user import UserORM
+from .user_auth_epoch import UserAuthEpochORM
 
 
-__all__ = ["CategoryORM", "PostORM", "TagORM", "post_tags", "UserORM"]
\ No newline at end of file
+__all__ = ["CacheGenerationORM", "CategoryORM", "MediaBlobORM", "PostORM", "SlugCounterORM", "TagORM", "post_tags", "UserORM", "UserAuthEpochORM"]
\ No newline at end of file
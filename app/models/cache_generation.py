@@ -0,0 +1,11 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class CacheGenerationORM(Base):
+    # contador por caché de proceso ("tags"): sube con cada cambio que la invalida, y un proceso
+    # que ve un valor distinto del suyo vacía su copia
+    __tablename__ = "cache_generations"
+    name: Mapped[str] = mapped_column(String(40), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
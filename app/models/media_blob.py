@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class MediaBlobORM(Base):
+    # un archivo del almacén por contenido (sha256) y cuántos posts lo usan
+    __tablename__ = "media_blobs"
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    filename: Mapped[str] = mapped_column(String(120), nullable=False)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -5,7 +5,7 @@ from sqlalchemy import Integer, String, Table, Column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional, TYPE_CHECKING
 from app.core.db import Base
-from sqlalchemy import Text, DateTime, UniqueConstraint, ForeignKey
+from sqlalchemy import Text, DateTime, UniqueConstraint, ForeignKey, JSON
 
 from app.models.category import CategoryORM
 
@@ -31,8 +31,12 @@ class PostORM(Base):
     slug: Mapped[str] = mapped_column(String(160), unique=True, index=True)
     content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     image_url = mapped_column(String(300), nullable=True)
+    # derivados de image_url (anchos y WebP); los rellena el pipeline de imágenes en segundo plano
+    image_variants: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, default=datetime.utcnow)
+    # se incrementa en cada cambio visible del post; alimenta el ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
     user: Mapped[Optional["UserORM"]] = relationship(back_populates="posts")
@@ -0,0 +1,10 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class SlugCounterORM(Base):
+    # último sufijo repartido para cada slug base ("mi-post" -> 3 ya entregó mi-post, mi-post-2 y mi-post-3)
+    __tablename__ = "slug_counters"
+    base: Mapped[str] = mapped_column(String(160), primary_key=True)
+    last: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class UserAuthEpochORM(Base):
+    # último cambio de rol o de alta de cada usuario: los tokens emitidos antes no valen por sí solos
+    __tablename__ = "user_auth_epochs"
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,144 @@
+
+# Generador de datos sintéticos a gran escala: inserciones en bloque, RNG determinista,
+# un único hash de contraseña y tags con distribución de ley de potencias
+
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.models import CategoryORM, PostORM, TagORM, UserORM, post_tags
+from app.services.password_hashing import hash_password
+from app.services.post_search import ensure_search_index, index_rows
+
+WORDS = (
+    "fastapi python sqlalchemy async rendimiento cache indices consulta servidor cliente "
+    "latencia memoria proceso hilo pool conexion base datos tabla fila columna esquema "
+    "migracion despliegue docker contenedor imagen red http json api rest ruta endpoint "
+    "middleware sesion token usuario rol admin editor post tag categoria busqueda texto "
+    "pagina cursor orden filtro lote carga prueba benchmark perfil traza metrica log "
+    "error excepcion reintento bloqueo transaccion commit rollback savepoint evento "
+    "cola worker tarea fondo streaming fichero subida media miniatura compresion gzip"
+).split()
+
+ROLES = ("user", "editor", "admin")
+ROLE_WEIGHTS = (90, 9, 1)
+
+
+def _next_id(db: Session, model) -> int:
+    return (db.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert_with_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    # ids asignados aquí y executemany sin RETURNING: con RETURNING ordenado SQLite hace un
+    # INSERT por fila. El generador es el único que escribe mientras corre
+    if not rows:
+        return []
+    first = _next_id(db, model)
+    ids = list(range(first, first + len(rows)))
+    db.execute(insert(model), [{**row, "id": row_id} for row, row_id in zip(rows, ids)])
+    return ids
+
+
+def _sync_sequences(db: Session, *models) -> None:
+    # Postgres: los ids explícitos no avanzan la secuencia del serial
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+def power_law_weights(count: int, exponent: float) -> List[float]:
+    # el tag de rango r aparece con probabilidad proporcional a 1 / r^exponent
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def generate(
+    db: Session,
+    users: int,
+    categories: int,
+    tags: int,
+    posts: int,
+    seed: int = 42,
+    chunk_size: int = 5000,
+    password: str = "password123",
+    tag_exponent: float = 1.1,
+    max_tags_per_post: int = 5,
+    on_chunk=None,
+) -> Dict[str, int]:
+    rng = random.Random(seed)
+    # argon2 una sola vez: todos los usuarios generados comparten contraseña
+    hashed = hash_password(password)
+    ensure_search_index(db.get_bind())
+
+    # los nombres continúan desde los ids existentes para no chocar con datos previos
+    first_user = _next_id(db, UserORM)
+    user_ids = _insert_with_ids(db, UserORM, [
+        {
+            "email": f"user{n}@example.com",
+            "full_name": f"Usuario {n}",
+            "role": rng.choices(ROLES, weights=ROLE_WEIGHTS)[0],
+            "hashed_password": hashed,
+        }
+        for n in range(first_user, first_user + users)
+    ])
+    first_category = _next_id(db, CategoryORM)
+    category_ids = _insert_with_ids(db, CategoryORM, [
+        {"name": f"Categoria {n}", "slug": f"categoria-{n}"}
+        for n in range(first_category, first_category + categories)
+    ])
+    # ordenados por popularidad: el primer id es el tag más usado
+    first_tag = _next_id(db, TagORM)
+    tag_ids = _insert_with_ids(db, TagORM, [{"name": f"tag{n}"} for n in range(first_tag, first_tag + tags)])
+    db.commit()
+
+    tag_weights = power_law_weights(len(tag_ids), tag_exponent)
+    first_post = _next_id(db, PostORM)
+    now = datetime.utcnow()
+    links_total = 0
+    for start in range(0, posts, chunk_size):
+        numbers = range(first_post + start, first_post + min(start + chunk_size, posts))
+        rows = []
+        for n in numbers:
+            words = rng.choices(WORDS, k=rng.randint(2, 6))
+            rows.append({
+                "title": f"{' '.join(words).capitalize()} {n}",
+                "slug": f"{'-'.join(words)}-{n}",
+                "content": " ".join(rng.choices(WORDS, k=rng.randint(30, 120))),
+                "user_id": rng.choice(user_ids) if user_ids else None,
+                "category_id": rng.choice(category_ids) if category_ids else None,
+                "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            })
+        post_ids = _insert_with_ids(db, PostORM, rows)
+
+        links = []
+        if tag_ids:
+            for post_id in post_ids:
+                count = rng.randint(1, max_tags_per_post)
+                for tag_id in set(rng.choices(tag_ids, cum_weights=tag_weights, k=count)):
+                    links.append({"post_id": post_id, "tag_id": tag_id})
+        if links:
+            db.execute(insert(post_tags), links)
+        links_total += len(links)
+
+        index_rows(db, [{"id": post_id, "title": row["title"], "content": row["content"]} for post_id, row in zip(post_ids, rows)])
+        db.commit()
+        if on_chunk:
+            on_chunk(start + len(rows), posts)
+
+    _sync_sequences(db, UserORM, CategoryORM, TagORM, PostORM)
+    db.commit()
+
+    return {
+        "users": len(user_ids),
+        "categories": len(category_ids),
+        "tags": len(tag_ids),
+        "posts": posts,
+        "post_tags": links_total,
+    }
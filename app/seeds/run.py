@@ -1,10 +1,11 @@
 
+import time
 import typer
 
 from app.seeds.service import run_all, run_categories, run_tags, run_users 
 
 
-app = typer.Typer(help="Seeds: users, categories, tags")
+app = typer.Typer(help="Seeds: users, categories, tags, generate")
 
 
 @app.command("all")
@@ -26,5 +27,31 @@ def categories():
 def tags():
     run_tags()
     typer.echo("Tags cargados")
-    
-    
+
+
+@app.command("generate")
+def generate_(
+    users: int = typer.Option(100, help="Usuarios a crear"),
+    categories: int = typer.Option(20, help="Categorías a crear"),
+    tags: int = typer.Option(500, help="Tags a crear"),
+    posts: int = typer.Option(10_000, help="Posts a crear"),
+    seed: int = typer.Option(42, help="Semilla del RNG: misma semilla, mismos datos"),
+    chunk_size: int = typer.Option(5000, help="Filas por INSERT en bloque"),
+    password: str = typer.Option("password123", help="Contraseña de todos los usuarios generados"),
+    tag_exponent: float = typer.Option(1.1, help="Exponente de la ley de potencias de los tags"),
+):
+    from app.core.db import Base, SessionLocal, engine
+    from app.seeds.generate import generate
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+
+    def progress(done: int, total: int):
+        typer.echo(f"  posts {done}/{total} ({time.perf_counter() - start:.1f}s)")
+
+    with SessionLocal() as db:
+        counts = generate(
+            db, users=users, categories=categories, tags=tags, posts=posts, seed=seed,
+            chunk_size=chunk_size, password=password, tag_exponent=tag_exponent, on_chunk=progress,
+        )
+    typer.echo(f"Datos generados en {time.perf_counter() - start:.1f}s: {counts}")
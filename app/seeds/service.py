@@ -2,7 +2,6 @@
 
 from contextlib import contextmanager
 from typing import Optional
-from pwdlib import PasswordHash
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -10,6 +9,7 @@ from app.core.db import SessionLocal
 from app.models.category import CategoryORM
 from app.models.tag import TagORM
 from app.models.user import UserORM
+from app.services.password_hashing import password_hasher
 from app.seeds.data.categories import CATEGORIES
 from app.seeds.data.tags import TAGS
 from app.seeds.data.users import USERS
@@ -19,8 +19,11 @@ from app.core.db import DATABASE_URL
 print("RUNNING service.py FROM:", __file__)
 print("DATABASE_URL:", DATABASE_URL)
 
-def hash_password(plain: str) -> str:
-    return PasswordHash.recommended().hash(plain)
+def hash_passwords(users) -> dict:
+    # email -> hash, repartido entre los workers del pool de hashing (mismos parámetros que la API)
+    with_password = [data for data in users if data.get("password")]
+    hashes = password_hasher.hash_many(data["password"] for data in with_password)
+    return {data["email"]: hashed for data, hashed in zip(with_password, hashes)}
 
 @contextmanager
 def atomic(db:Session):
@@ -42,6 +45,7 @@ def _tag_by_name(db:Session, name:str) -> Optional[TagORM]:
 
 
 def seed_users(db:Session) -> None:
+    hashes = hash_passwords(USERS)
     with atomic(db):
         for data in USERS:
             obj = _user_by_email(db, data["email"])
@@ -51,7 +55,7 @@ def seed_users(db:Session) -> None:
                     obj.full_name = data.get("full_name")
                     changed = True
                 if data.get("password"):
-                    obj.hashed_password = hash_password(data["password"])
+                    obj.hashed_password = hashes[data["email"]]
                     changed = True
                 if data.get("role"):
                     obj.role = data.get("role")
@@ -63,7 +67,7 @@ def seed_users(db:Session) -> None:
                     email= data["email"],
                     full_name = data["full_name"],
                     role = data["role"],
-                    hashed_password = hash_password(data["password"])
+                    hashed_password = hashes[data["email"]]
                 ))
                 
                 
@@ -0,0 +1,139 @@
+
+# Access log estructurado (JSON lines): el middleware encola y un hilo escribe, con muestreo por ruta
+
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+_STOP = object()
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    # "/posts=0.1,/posts/{post_id}=0.5" -> {"/posts": 0.1, "/posts/{post_id}": 0.5}
+    rates = {}
+    for item in value.split(","):
+        route, _, rate = item.strip().rpartition("=")
+        if route:
+            rates[route] = float(rate)
+    return rates
+
+
+class AccessLogger:
+    # Nunca bloquea la petición: si la cola está llena el registro se descarta y se cuenta
+    def __init__(
+        self,
+        path: Optional[str],
+        queue_size: int,
+        sample_rate: float = 1.0,
+        route_sample_rates: Optional[Dict[str, float]] = None,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.route_sample_rates = route_sample_rates or {}
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"enqueued": 0, "dropped": 0, "sampled_out": 0, "written": 0}
+
+    def _build_handler(self) -> logging.Handler:
+        if self.path:
+            return RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8")
+        return logging.StreamHandler(sys.stdout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(self._build_handler(),), name="access-log", daemon=True)
+                self._thread.start()
+
+    def sampled(self, route: str, status_code: int) -> bool:
+        # los errores siempre se registran; el resto según la tasa de su ruta
+        if status_code >= 400:
+            return True
+        rate = self.route_sample_rates.get(route, self.sample_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def log(self, record: dict) -> None:
+        if not self.sampled(record.get("route") or record.get("path", ""), record.get("status", 0)):
+            self.counters["sampled_out"] += 1
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+            self.counters["enqueued"] += 1
+        except queue.Full:
+            self.counters["dropped"] += 1
+
+    def _run(self, handler: logging.Handler) -> None:
+        # la serialización a JSON y la escritura pasan aquí, fuera del event loop
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            for item in batch:
+                if item is _STOP:
+                    continue
+                handler.emit(logging.makeLogRecord({"msg": json.dumps(item, ensure_ascii=False, default=str)}))
+                self.counters["written"] += 1
+            handler.flush()
+            if stop:
+                handler.close()
+                return
+
+    def stats(self) -> dict:
+        return {**self.counters, "queued": self._queue.qsize()}
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP, timeout=timeout)
+        thread.join(timeout)
+
+
+def access_record(scope, request_id: str, status_code: int, duration: float, response_bytes: int) -> dict:
+    route = scope.get("route")
+    client = scope.get("client")
+    query = scope.get("query_string", b"")
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "request_id": request_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": query.decode("latin-1") if query else None,
+        "route": getattr(route, "path", None),
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "bytes": response_bytes,
+        "client": client[0] if client else None,
+    }
+
+
+access_logger = AccessLogger(
+    path=settings.ACCESS_LOG_PATH,
+    queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    route_sample_rates=parse_sample_rates(settings.ACCESS_LOG_ROUTE_SAMPLE_RATES),
+    max_bytes=settings.ACCESS_LOG_MAX_BYTES,
+    backup_count=settings.ACCESS_LOG_BACKUP_COUNT,
+)
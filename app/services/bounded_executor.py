@@ -0,0 +1,59 @@
+
+# Pool acotado compartido por el hashing de contraseñas y el pipeline de imágenes
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Optional
+
+
+class BoundedExecutor:
+    # Como mucho workers + queue_limit tareas a la vez (en ejecución o en cola); con el pool lleno
+    # submit devuelve None y quien llama decide qué hacer (503, quedarse con el original...).
+    # Cada tarea deja de contar al terminar o al cancelarse, también las que cancela shutdown
+    def __init__(self, workers: int, queue_limit: int, factory: Callable[[], Executor]):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.max_in_flight = max(workers, 1) + queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    def executor(self) -> Executor:
+        # se crea al primer uso: importar el módulo no arranca hilos ni procesos
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    def submit(self, fn, *args) -> Optional[Future]:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return None
+            self.in_flight += 1
+        try:
+            future = self.executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, busy: Callable[[], Exception]):
+        future = self.submit(fn, *args)
+        if future is None:
+            raise busy()
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
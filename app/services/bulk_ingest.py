@@ -0,0 +1,111 @@
+
+# Lectura en streaming de lotes de posts: NDJSON (un objeto por línea) o un array JSON
+
+import codecs
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+MAX_ITEM_BYTES = 1024 * 1024
+
+# (índice, objeto decodificado o None, error o None)
+BulkEntry = Tuple[int, Any, str | None]
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[BulkEntry]:
+    buffer = b""
+    index = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        # primero las líneas ya completas (cada una con su límite), luego el resto sin terminar
+        for line in lines:
+            if not line.strip():
+                continue
+            yield _check_line(index, line)
+            index += 1
+        if len(buffer) > MAX_ITEM_BYTES:
+            yield index, None, "Línea demasiado grande"
+            return
+    if buffer.strip():
+        yield _check_line(index, buffer)
+
+
+def _check_line(index: int, line: bytes) -> BulkEntry:
+    if len(line) > MAX_ITEM_BYTES:
+        return index, None, "Línea demasiado grande"
+    return _decode_line(index, line)
+
+
+def _decode_line(index: int, line: bytes) -> BulkEntry:
+    try:
+        return index, json.loads(line), None
+    except ValueError as e:
+        return index, None, f"JSON inválido: {e}"
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[BulkEntry]:
+    # Decodifica los elementos del array a medida que llegan, sin tener el cuerpo entero en memoria
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    index = 0
+
+    async def more() -> bool:
+        nonlocal buffer
+        async for chunk in chunks:
+            buffer += text_decoder.decode(chunk)
+            return True
+        buffer += text_decoder.decode(b"", final=True)
+        return False
+
+    pending = True
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                if not pending:
+                    yield index, None, "Cuerpo vacío: se esperaba un array JSON"
+                    return
+                pending = await more()
+                continue
+            if buffer[0] != "[":
+                yield index, None, "Se esperaba un array JSON"
+                return
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith("]"):
+            return
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except ValueError as e:
+            if pending and len(buffer) <= MAX_ITEM_BYTES:
+                pending = await more()
+                continue
+            yield index, None, f"JSON inválido: {e}"
+            return
+        yield index, value, None
+        index += 1
+        buffer = buffer[end:]
+
+
+def iter_bulk_entries(content_type: str | None, chunks: AsyncIterator[bytes]) -> AsyncIterator[BulkEntry]:
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type):
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks)
+
+
+async def batched(entries: AsyncIterator[BulkEntry], size: int) -> AsyncIterator[List[BulkEntry]]:
+    batch: List[BulkEntry] = []
+    async for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
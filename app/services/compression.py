@@ -0,0 +1,115 @@
+
+# Compresión de respuestas negociada con Accept-Encoding (zstd, br, gzip). brotli y zstandard
+# son opcionales: si no están instalados solo se ofrece lo disponible (gzip siempre).
+
+import zlib
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Z_SYNC_FLUSH: el cliente puede descomprimir lo recibido sin esperar al final
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+ENCODERS: Dict[str, Callable] = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+# preferencia del servidor cuando el cliente da la misma q a varias
+PREFERENCE = [name.strip() for name in settings.COMPRESSION_ENCODINGS.split(",") if name.strip() in ENCODERS]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in PREFERENCE:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    content_type = (content_type or "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+def no_compression(endpoint):
+    # excluye una ruta de la compresión (p. ej. respuestas con secretos: BREACH)
+    endpoint.no_compression = True
+    return endpoint
@@ -0,0 +1,36 @@
+
+# ETags fuertes para lecturas de posts, derivados del contador de versión
+
+import hashlib
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models.post import PostORM
+
+
+def post_etag(post_id: int, version: int, created_at, representation: str) -> str:
+    # created_at evita reutilizar un ETag si SQLite recicla el id de un post borrado
+    created = created_at.isoformat() if created_at is not None else ""
+    digest = hashlib.sha1(f"{post_id}:{version}:{created}:{representation}".encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidates = (value.strip() for value in if_none_match.split(","))
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def bump_post_versions(db: Session, *criteria) -> None:
+    # Invalida los ETags de todos los posts que cumplan los criterios (cambios de tags, categoría, autor)
+    db.execute(
+        update(PostORM)
+        .where(*criteria)
+        .values(version=PostORM.version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
@@ -1,66 +1,176 @@
+
+import hashlib
+import logging
 import os
-import shutil
+import re
 import uuid
-from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from typing import Iterable, List, Optional, Tuple
+from fastapi import UploadFile, HTTPException, status
+
+from app.core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
 MEDIA_DIR = "app/media"
-ALLOW_MIME = ["image/png", "image/jpeg"]
-MAX_MB = int(os.getenv("MAX_UPLOAD_MB", "3"))
+# fuera de /media: lo que se aparta al borrar no se puede servir
+TRASH_DIR = "app/media-trash"
 CHUNKS = 1024 * 1024
+MAX_MB = settings.MAX_UPLOAD_MB
+MAX_BYTES = MAX_MB * CHUNKS
+
+# el tipo se deduce de los primeros bytes, no del content_type que manda el cliente
+SIGNATURES: Tuple[Tuple[bytes, str, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+)
+ALLOW_MIME = [mime for _, mime, _ in SIGNATURES]
+
+# almacén por contenido: /media/ab/cd/<sha256>.ext (los derivados comparten prefijo: <sha256>-320.webp)
+BLOB_URL = re.compile(r"^/media/([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})\.[a-z]+$")
 
 
 def ensure_media_dir() -> None:
     os.makedirs(MEDIA_DIR, exist_ok=True)
 
 
-def save_uploaded_file(file: UploadFile) -> dict:
-    if file.content_type not in ALLOW_MIME:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Solo se permiten imágenes PNG o JPEG"
-        )
+def blob_filename(digest: str, ext: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
 
-    ensure_media_dir()
-    ext = os.path.splitext(file.filename)[1]  # .png, .jpeg
-    filename = f"{uuid.uuid4().hex}{ext}"
-    file_path = os.path.join(MEDIA_DIR, filename)
+def blob_digest(url: Optional[str]) -> Optional[str]:
+    match = BLOB_URL.match(url or "")
+    return match.group(3) if match else None
 
-    # class _ChunkCounter:
-    #     def __init__(self, f):
-    #         self._f = f
-    #         self.calls = 0
-    #         self.sizes = []
 
-    #     def read(self, n=-1):
-    #         data = self._f.read(n)
-    #         if data:
-    #             self.calls += 1
-    #             self.sizes.append(len(data))
-    #         return data
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Archivo demasiado grande (>{MAX_MB} MB)"
+    )
 
-    #     def __getattr__(self, name):  # delega cualquier otro atributo
-    #         return getattr(self._f, name)
 
-    # reader = _ChunkCounter(file.file)
+def sniff_image(head: bytes) -> Optional[Tuple[str, str]]:
+    for magic, mime, ext in SIGNATURES:
+        if head.startswith(magic):
+            return mime, ext
+    return None
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer, length=CHUNKS)
 
-    size = os.path.getsize(file_path)
-    if size > MAX_MB * CHUNKS:
-        os.remove(file_path)
+def _digest_upload(source) -> Tuple[str, int, Tuple[str, str]]:
+    # primera pasada sobre el upload ya recibido (memoria o temporal): tipo, tamaño y sha256, sin escribir nada
+    source.seek(0)
+    head = source.read(CHUNKS)
+    kind = sniff_image(head)
+    if kind is None:
         raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"Archivo demasiado grande (>{MAX_MB} MB)"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Solo se permiten imágenes PNG o JPEG"
         )
+    sha256 = hashlib.sha256()
+    size = 0
+    chunk = head
+    # contador de bytes mientras se lee: se aborta al pasar el límite
+    while chunk:
+        size += len(chunk)
+        if size > MAX_BYTES:
+            raise upload_too_large()
+        sha256.update(chunk)
+        chunk = source.read(CHUNKS)
+    return sha256.hexdigest(), size, kind
+
 
+def inspect_upload(file: UploadFile) -> dict:
+    # E/S bloqueante: se llama con run_in_threadpool, nunca directamente desde el event loop
+    if file.size is not None and file.size > MAX_BYTES:
+        raise upload_too_large()
+
+    digest, size, (content_type, ext) = _digest_upload(file.file)
+    filename = blob_filename(digest, ext)
     return {
         "filename": filename,
-        "content_type": file.content_type,
+        "content_type": content_type,
         "url": f"/media/{filename}",
-        # "size": size,
-        # "chunk_size_used": CHUNKS,
-        # "chunk_calls": reader.calls,
-        # "chunk_sizes_sample": reader.sizes[:5]
-    }
\ No newline at end of file
+        "path": os.path.join(MEDIA_DIR, filename),
+        "size": size,
+        "sha256": digest,
+    }
+
+
+def store_upload(file: UploadFile, saved: dict) -> bool:
+    # Escribe el blob si falta. Con un post de por medio se llama después de acquire_media y
+    # antes del commit: la fila de media_blobs queda bloqueada y un borrado simultáneo no puede
+    # quitar el archivo entre esta comprobación y el commit
+    file_path = saved["path"]
+    if os.path.exists(file_path):
+        return False
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    partial_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    source = file.file
+    try:
+        source.seek(0)
+        with open(partial_path, "wb") as buffer:
+            while chunk := source.read(CHUNKS):
+                buffer.write(chunk)
+        # dos subidas iguales a la vez escriben el mismo contenido: gana la última, sin diferencia
+        os.replace(partial_path, file_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return True
+
+
+def save_uploaded_file(file: UploadFile) -> dict:
+    # subida suelta, sin post que la referencie
+    saved = inspect_upload(file)
+    saved["stored"] = store_upload(file, saved)
+    return saved
+
+
+def _blob_entries(filename: str) -> List[str]:
+    # el original y sus derivados (<sha256>-320.jpg, <sha256>.webp, ...)
+    directory, name = os.path.split(os.path.join(MEDIA_DIR, filename))
+    stem = os.path.splitext(name)[0]
+    try:
+        return [os.path.join(directory, entry) for entry in os.listdir(directory) if entry.startswith(stem)]
+    except FileNotFoundError:
+        return []
+
+
+def detach_blob_files(filenames: Iterable[str]) -> List[Tuple[str, str]]:
+    # Antes del commit que borra las filas: se apartan a TRASH_DIR mientras la fila sigue bloqueada,
+    # así una subida igual que llegue después del commit ya no los encuentra y los vuelve a escribir.
+    # Devuelve (ruta original, ruta apartada) para restaurar con rollback o purgar tras el commit
+    moved = []
+    for filename in filenames:
+        for path in _blob_entries(filename):
+            target = os.path.join(TRASH_DIR, f"{uuid.uuid4().hex}-{os.path.basename(path)}")
+            try:
+                os.makedirs(TRASH_DIR, exist_ok=True)
+                os.replace(path, target)
+                moved.append((path, target))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.exception("No se pudo apartar %s", path)
+    return moved
+
+
+def restore_blob_files(moved: Iterable[Tuple[str, str]]) -> None:
+    for path, target in moved:
+        try:
+            os.replace(target, path)
+        except OSError:
+            logger.exception("No se pudo restaurar %s", path)
+
+
+def purge_blob_files(moved: Iterable[Tuple[str, str]]) -> None:
+    # tras el commit: un fallo solo deja basura en TRASH_DIR, nunca un 500 de un borrado ya confirmado
+    for _, target in moved:
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception("No se pudo borrar %s", target)
@@ -0,0 +1,130 @@
+
+# Derivados de las imágenes subidas (anchos 320/800/1600 y WebP), generados en segundo plano
+# en un pool acotado. La petición que sube la imagen no espera: el post guarda los derivados
+# en image_variants cuando están listos y mientras tanto se sirve el original.
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.services.bounded_executor import BoundedExecutor
+from app.services.file_storage import MEDIA_DIR
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"PNG": (".png", "image/png"), "JPEG": (".jpg", "image/jpeg")}
+
+
+def parse_widths(value: str) -> List[int]:
+    return sorted({int(width) for width in value.split(",") if width.strip()})
+
+
+def _describe(path: str, width: int, height: int, mime: str) -> dict:
+    filename = os.path.relpath(path, MEDIA_DIR).replace(os.sep, "/")
+    return {"width": width, "height": height, "content_type": mime, "url": f"/media/{filename}"}
+
+
+def _save(image: Image.Image, path: str, mime: str, **options) -> None:
+    partial_path = f"{path}.{uuid.uuid4().hex}.part"
+    image.save(partial_path, format=mime.split("/")[1].upper(), **options)
+    os.replace(partial_path, path)
+
+
+def build_variants(path: str, widths: List[int]) -> List[dict]:
+    # E/S y CPU: solo desde el pool. Sin ampliar: los anchos mayores que el original se omiten,
+    # y el original siempre tiene su versión WebP
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    variants = []
+    with Image.open(path) as source:
+        ext, mime = FORMATS[source.format]
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA", "L", "LA"):
+            source = source.convert("RGBA" if "transparency" in source.info else "RGB")
+        for width in [width for width in widths if width < source.width] + [source.width]:
+            height = max(round(source.height * width / source.width), 1)
+            if width == source.width:
+                names = [(f"{stem}.webp", "image/webp")]
+            else:
+                names = [(f"{stem}-{width}{ext}", mime), (f"{stem}-{width}.webp", "image/webp")]
+            outputs = [(os.path.join(directory, output), output_mime) for output, output_mime in names]
+            variants += [_describe(output, width, height, output_mime) for output, output_mime in outputs]
+            # almacén por contenido: el mismo original da los mismos derivados; si ya están, ni se redimensiona
+            pending = [(output, output_mime) for output, output_mime in outputs if not os.path.exists(output)]
+            if not pending:
+                continue
+            image = source if width == source.width else source.resize((width, height), Image.Resampling.LANCZOS)
+            for output, output_mime in pending:
+                if output_mime == "image/webp":
+                    _save(image, output, output_mime, quality=settings.IMAGE_WEBP_QUALITY, method=4)
+                elif output_mime == "image/jpeg":
+                    _save(image.convert("RGB"), output, output_mime, quality=settings.IMAGE_JPEG_QUALITY, optimize=True)
+                else:
+                    _save(image, output, output_mime, optimize=True)
+    return variants
+
+
+class ImagePipeline:
+    # Con el pool lleno el post se queda solo con el original
+    def __init__(self, workers: int, queue_limit: int, widths: List[int]):
+        self.workers = max(workers, 1)
+        self.queue_limit = queue_limit
+        self.widths = widths
+        self.processed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self.pool = BoundedExecutor(self.workers, queue_limit, self._create_executor)
+
+    def _create_executor(self) -> Executor:
+        # Pillow libera el GIL al redimensionar y codificar: bastan hilos
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variants")
+
+    def submit(self, post_id: int, path: str, image_url: str) -> bool:
+        return self.pool.submit(self._process, post_id, path, image_url) is not None
+
+    def _process(self, post_id: int, path: str, image_url: str) -> None:
+        from app.api.v1.posts.repository import PostRepository
+
+        try:
+            variants = build_variants(path, self.widths)
+            with SessionLocal() as db:
+                PostRepository(db).set_image_variants(post_id, image_url, variants)
+                db.commit()
+            ok = True
+        except Exception:
+            # el post se queda con el original; la traza queda en el log y el fallo en /metrics
+            logger.exception("No se pudieron generar los derivados del post %s (%s)", post_id, image_url)
+            ok = False
+        with self._lock:
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            # cola + en proceso; las que cancela shutdown dejan de contar
+            "pending": self.pool.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "skipped": self.pool.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+image_pipeline = ImagePipeline(
+    workers=settings.IMAGE_WORKERS,
+    queue_limit=settings.IMAGE_QUEUE_LIMIT,
+    widths=parse_widths(settings.IMAGE_VARIANT_WIDTHS),
+)
@@ -0,0 +1,113 @@
+
+# Servido de /media. Los nombres no se reutilizan nunca (sha256 del contenido, o uuid en los
+# archivos antiguos), así que las respuestas se pueden cachear para siempre. Range y 304 los
+# resuelve FileResponse; con servidores que ofrecen http.response.pathsend el envío es sin copia,
+# y con MEDIA_ACCEL_REDIRECT_PREFIX el archivo lo entrega nginx (sendfile) sin pasar por Python.
+
+import os
+import re
+import stat
+from mimetypes import guess_type
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(-\d+)?\.[a-z0-9.]+$")
+# ya van comprimidos: no se buscan .br/.gz
+COMPRESSED_TYPES = frozenset({"image/png", "image/jpeg", "image/webp", "image/gif"})
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+WEBP_SOURCES = (".png", ".jpg", ".jpeg")
+
+
+def accepts(header: Optional[str], token: str) -> bool:
+    # token presente en Accept / Accept-Encoding y sin q=0
+    for item in (header or "").split(","):
+        value, _, params = item.partition(";")
+        if value.strip().lower() != token:
+            continue
+        q = params.strip().lower()
+        if not q.startswith("q="):
+            return True
+        try:
+            return float(q[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+class MediaFiles(StaticFiles):
+    def __init__(self, *args, max_age: int = settings.MEDIA_CACHE_MAX_AGE, accel_prefix: Optional[str] = settings.MEDIA_ACCEL_REDIRECT_PREFIX, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}, immutable"
+        self.accel_prefix = accel_prefix
+
+    def lookup_variant(self, path: str, headers: Headers) -> Tuple[str, Optional[os.stat_result], str, Optional[str], List[str]]:
+        # en un hilo: todos los stat de la negociación en un solo salto
+        # -> (ruta servida, stat, content-type, content-encoding, Vary)
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return full_path, None, "", None, []
+        media_type = guess_type(full_path)[0] or "application/octet-stream"
+        vary: List[str] = []
+
+        stem, ext = os.path.splitext(path)
+        if ext.lower() in WEBP_SOURCES:
+            # el pipeline de imágenes deja <sha256>.webp junto al original
+            vary.append("Accept")
+            if accepts(headers.get("accept"), "image/webp"):
+                webp_path, webp_stat = self.lookup_path(f"{stem}.webp")
+                if webp_stat is not None and stat.S_ISREG(webp_stat.st_mode):
+                    return webp_path, webp_stat, "image/webp", None, vary
+
+        if media_type not in COMPRESSED_TYPES:
+            vary.append("Accept-Encoding")
+            for encoding, suffix in ENCODINGS:
+                if accepts(headers.get("accept-encoding"), encoding):
+                    encoded_path, encoded_stat = self.lookup_path(path + suffix)
+                    if encoded_stat is not None and stat.S_ISREG(encoded_stat.st_mode):
+                        return encoded_path, encoded_stat, media_type, encoding, vary
+        return full_path, stat_result, media_type, None, vary
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        request_headers = Headers(scope=scope)
+        try:
+            full_path, stat_result, media_type, encoding, vary = await anyio.to_thread.run_sync(
+                self.lookup_variant, path, request_headers
+            )
+        except (OSError, ValueError):
+            raise HTTPException(status_code=404)
+        if stat_result is None:
+            raise HTTPException(status_code=404)
+
+        headers = {"Cache-Control": self.cache_control}
+        name = os.path.basename(full_path)
+        if HASHED_NAME.match(name):
+            # ETag fuerte: el nombre es el hash del contenido (y distingue .webp / .br de cada variante)
+            headers["ETag"] = f'"{name}"'
+        if vary:
+            headers["Vary"] = ", ".join(vary)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if self.accel_prefix:
+            # nginx entrega el archivo (sendfile, Range) desde su location interna
+            relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            response = Response(media_type=media_type, headers=headers)
+            response.headers["X-Accel-Redirect"] = self.accel_prefix.rstrip("/") + "/" + relative
+            if "etag" in response.headers and self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = FileResponse(full_path, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
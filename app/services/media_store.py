@@ -0,0 +1,84 @@
+
+# Referencias de los posts a los archivos del almacén por contenido. Un mismo sha256 puede
+# estar en varios posts; el archivo (y sus derivados) se borra cuando el último lo suelta.
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.media_blob import MediaBlobORM
+from app.services.file_storage import blob_digest
+
+table = MediaBlobORM.__table__
+
+
+def _blobs(urls: Iterable[Optional[str]]) -> Tuple[Counter, Dict[str, str]]:
+    # (apariciones por sha256, sha256 -> ruta relativa); las URLs que no son del almacén
+    # (archivos antiguos, enlaces externos) no cuentan
+    counts, filenames = Counter(), {}
+    for url in urls:
+        digest = blob_digest(url)
+        if digest:
+            counts[digest] += 1
+            filenames[digest] = url[len("/media/"):]
+    return counts, filenames
+
+
+def _create_blobs(db: Session, filenames: Dict[str, str]) -> None:
+    rows = [{"digest": digest, "filename": filename, "refcount": 0} for digest, filename in filenames.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(MediaBlobORM), row)
+            except IntegrityError:
+                pass
+        return
+    db.execute(dialect_insert(MediaBlobORM).on_conflict_do_nothing(index_elements=["digest"]), rows)
+
+
+def acquire_media(db: Session, urls: Iterable[Optional[str]]) -> None:
+    # refcount += apariciones, creando la fila la primera vez (mismo patrón que los contadores de slug)
+    counts, filenames = _blobs(urls)
+    if not counts:
+        return
+    increment = (
+        update(table)
+        .where(table.c.digest == bindparam("b_digest"))
+        .values(refcount=table.c.refcount + bindparam("b_count"))
+    )
+    result = db.execute(increment, [{"b_digest": digest, "b_count": n} for digest, n in counts.items()])
+    if result.rowcount != len(counts):
+        known = set(db.execute(select(table.c.digest).where(table.c.digest.in_(counts))).scalars())
+        missing = sorted(set(counts) - known)
+        if missing:
+            _create_blobs(db, {digest: filenames[digest] for digest in missing})
+            db.execute(increment, [{"b_digest": digest, "b_count": counts[digest]} for digest in missing])
+
+
+def release_media(db: Session, urls: Iterable[Optional[str]]) -> List[str]:
+    # refcount -= apariciones y, en la misma transacción, fuera las filas que llegan a 0.
+    # Devuelve las rutas de esos blobs: el llamador aparta los archivos antes del commit
+    # (detach_blob_files) y los purga después, fuera del event loop
+    counts, _ = _blobs(urls)
+    if not counts:
+        return []
+    db.execute(
+        update(table)
+        .where(table.c.digest == bindparam("b_digest"))
+        .values(refcount=table.c.refcount - bindparam("b_count")),
+        [{"b_digest": digest, "b_count": n} for digest, n in counts.items()],
+    )
+    # el DELETE deja la fila bloqueada hasta el commit: una subida igual espera en acquire_media
+    # y después ya no la encuentra, la crea de nuevo y escribe el archivo (store_upload)
+    return db.execute(
+        delete(table).where(table.c.digest.in_(counts), table.c.refcount <= 0).returning(table.c.filename)
+    ).scalars().all()
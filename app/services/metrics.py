@@ -0,0 +1,157 @@
+
+# Métricas en formato Prometheus: latencia por ruta y estado, peticiones en curso y SQL por ruta.
+# Cada hilo escribe en su propio shard sin locks; /metrics suma los shards al leer.
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [sentencias, segundos] de la petición en curso; lo comparten los hilos/greenlets que la atienden
+request_sql: ContextVar[Optional[List[float]]] = ContextVar("request_sql", default=None)
+
+NO_ROUTE = "unmatched"
+BACKGROUND = "background"
+
+
+class _Shard:
+    def __init__(self):
+        # (method, route, status) -> [contador por bucket..., +Inf, suma]
+        self.requests: Dict[Tuple[str, str, str], List[float]] = {}
+        # route -> [sentencias, segundos]
+        self.sql: Dict[str, List[float]] = {}
+
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.in_flight = 0
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, sql: Optional[List[float]]) -> None:
+        shard = self._shard()
+        key = (method, route, str(status_code))
+        series = shard.requests.get(key)
+        if series is None:
+            series = shard.requests[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+        if sql and sql[0]:
+            self.observe_sql(route, sql[0], sql[1], shard)
+
+    def observe_sql(self, route: str, statements: float, seconds: float, shard: Optional[_Shard] = None) -> None:
+        shard = shard or self._shard()
+        totals = shard.sql.get(route)
+        if totals is None:
+            totals = shard.sql[route] = [0, 0.0]
+        totals[0] += statements
+        totals[1] += seconds
+
+    def _merged(self):
+        requests: Dict[Tuple[str, str, str], List[float]] = {}
+        sql: Dict[str, List[float]] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, series in list(shard.requests.items()):
+                total = requests.setdefault(key, [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+            for route, (statements, seconds) in list(shard.sql.items()):
+                total = sql.setdefault(route, [0, 0.0])
+                total[0] += statements
+                total[1] += seconds
+        return requests, sql
+
+    def render(self, pools: Optional[dict] = None, images: Optional[dict] = None) -> str:
+        requests, sql = self._merged()
+        lines = [
+            "# HELP http_requests_in_flight Peticiones HTTP en curso",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Latencia de las peticiones HTTP",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status_code), series in sorted(requests.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status_code}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += [
+            "# HELP db_statements_total Sentencias SQL ejecutadas por ruta",
+            "# TYPE db_statements_total counter",
+        ]
+        lines += [f'db_statements_total{{route="{_escape(route)}"}} {int(statements)}' for route, (statements, _) in sorted(sql.items())]
+        lines += [
+            "# HELP db_statement_duration_seconds_total Tiempo en SQL por ruta",
+            "# TYPE db_statement_duration_seconds_total counter",
+        ]
+        lines += [f'db_statement_duration_seconds_total{{route="{_escape(route)}"}} {seconds:.6f}' for route, (_, seconds) in sorted(sql.items())]
+
+        gauges: Dict[str, List[str]] = {}
+        for name, stats in (pools or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                gauges.setdefault(key, []).append(f'db_pool_{key}{{engine="{name}"}} {value}')
+        for key, samples in gauges.items():
+            lines.append(f"# TYPE db_pool_{key} gauge")
+            lines += samples
+
+        if images is not None:
+            lines += [
+                "# HELP image_variants_jobs_total Imágenes del pipeline de derivados por resultado",
+                "# TYPE image_variants_jobs_total counter",
+            ]
+            lines += [f'image_variants_jobs_total{{result="{result}"}} {images[result]}' for result in ("processed", "failed", "skipped")]
+            lines += [
+                "# HELP image_variants_pending Imágenes en cola o en proceso",
+                "# TYPE image_variants_pending gauge",
+                f"image_variants_pending {images['pending']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+metrics = Metrics()
+
+
+def attach_sql_metrics(engine) -> None:
+    # Cada sentencia se suma a la petición en curso (contextvar); fuera de una petición, a "background"
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = perf_counter() - getattr(context, "_metrics_start", perf_counter())
+        current = request_sql.get()
+        if current is None:
+            metrics.observe_sql(BACKGROUND, 1, seconds)
+        else:
+            current[0] += 1
+            current[1] += seconds
@@ -1,17 +1,170 @@
+import base64
+import json
+import threading
+from datetime import datetime
 from math import ceil
-from typing import Any, Dict, Optional
-from sqlalchemy import func, select
+from time import monotonic
+from typing import Any, Dict, Hashable, Literal, Optional, Tuple
+from sqlalchemy import event, func, select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+
 DEFAULT_PER_PAGE = 10
 MAX_PER_PAGE = 100
 
+CountStrategy = Literal["exact", "cached", "estimated", "none"]
+
+
+class CountCache:
+    # Totales en memoria por (ámbito, filtro normalizado); cada escritura sube la generación del ámbito
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Hashable], Tuple[int, int, float]] = {}
+        self._generations: Dict[str, int] = {}
+
+    def get(self, scope: str, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None:
+                return None
+            total, generation, expires = entry
+            if generation != self._generations.get(scope, 0) or expires < monotonic():
+                del self._entries[(scope, key)]
+                return None
+            return total
+
+    def set(self, scope: str, key: Hashable, total: int, generation: int) -> None:
+        with self._lock:
+            # si hubo una escritura mientras se contaba, el total ya no vale
+            if generation != self._generations.get(scope, 0):
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[(scope, key)] = (total, generation, monotonic() + self.ttl_seconds)
+
+    def generation(self, scope: str) -> int:
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def invalidate(self, scope: str) -> None:
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+count_cache = CountCache(ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def normalize_filter(**filters) -> Tuple[Tuple[str, Any], ...]:
+    # "  Hola   Mundo " y "hola mundo" comparten entrada en la caché
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if isinstance(value, str):
+            value = " ".join(value.lower().split()) or None
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def mark_counts_dirty(db: Session, *scopes: str) -> None:
+    # se invalida al hacer commit, no antes, para no cachear totales de una transacción a medias
+    db.info.setdefault("dirty_count_scopes", set()).update(scopes)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_counts_after_commit(session: Session) -> None:
+    for scope in session.info.pop("dirty_count_scopes", ()):
+        count_cache.invalidate(scope)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_dirty_counts(session: Session, previous_transaction) -> None:
+    session.info.pop("dirty_count_scopes", None)
+
+
+def _estimated_count(db: Session, query) -> Optional[int]:
+    # Postgres: estimación del planner; el resto de motores no tiene una barata
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_query(
+    db: Session,
+    query,
+    strategy: CountStrategy = "exact",
+    scope: Optional[str] = None,
+    cache_key: Hashable = (),
+) -> Optional[int]:
+    if strategy == "none":
+        return None
+
+    if strategy == "estimated":
+        estimated = _estimated_count(db, query)
+        if estimated is not None:
+            return estimated
+        strategy = "cached"
+
+    if strategy == "cached" and scope is not None:
+        total = count_cache.get(scope, cache_key)
+        if total is not None:
+            return total
+        generation = count_cache.generation(scope)
+        total = db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        count_cache.set(scope, cache_key, total, generation)
+        return total
+
+    return db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
 def sanitize_pagination(page: int = 1, per_page: int = DEFAULT_PER_PAGE):
     # Comprobando que los valores estan en intervalos correctos
     page = max(1,int(page or 1))
     per_page = min(MAX_PER_PAGE, max(1,int(per_page or DEFAULT_PER_PAGE)))
     return page, per_page
 
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    # Cursor opaco: json compacto en base64 url-safe sin padding
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _cursor_key(value: Any, key_type: type) -> Any:
+    # bool es int en Python, pero no es una clave de orden válida
+    if isinstance(value, bool):
+        raise ValueError("Cursor inválido")
+    if key_type is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError as exc:
+            raise ValueError("Cursor inválido") from exc
+    if key_type is float and isinstance(value, (int, float)):
+        return float(value)
+    if key_type in (int, str) and isinstance(value, key_type):
+        return value
+    raise ValueError("Cursor inválido")
+
+def decode_cursor(cursor: str, key_type: Optional[type] = None) -> Dict[str, Any]:
+    # Con key_type se exige la posición completa: "k" del tipo de la columna de orden
+    # (int, float, str o datetime ISO) e "i" entero. Ambos acaban en la comparación SQL
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Cursor inválido")
+    if key_type is not None:
+        if "k" not in payload or "i" not in payload:
+            raise ValueError("Cursor inválido")
+        payload["k"] = _cursor_key(payload["k"], key_type)
+        payload["i"] = _cursor_key(payload["i"], int)
+    return payload
+
 def paginate_query(
     db: Session,
     model,
@@ -20,24 +173,30 @@ def paginate_query(
     per_page: int = DEFAULT_PER_PAGE,
     order_by : Optional[str] = None,
     direction:str = "asc",
-    allowed_order:Optional[Dict[str, Any]] = None
+    allowed_order:Optional[Dict[str, Any]] = None,
+    count_strategy:CountStrategy = "exact",
+    count_scope:Optional[str] = None,
+    count_key:Hashable = ()
     
 ):
     
     page, per_page = sanitize_pagination(page, per_page)
     query = base_query if base_query is not None else select(model)
-    total = db.scalar(select(func.count()).select_from(model))
+    total = count_query(db, query, strategy=count_strategy, scope=count_scope, cache_key=count_key)
     if total == 0:
-        return {"total":0, "pages":0, "page":0, "per_page":0, "items":[]}
+        return {"total":0, "pages":0, "page":0, "per_page":0, "has_next":False, "items":[]}
     
     if allowed_order and order_by:
         col = allowed_order.get(order_by,allowed_order.get("id"))
         query = query.order_by(col.desc() if direction == "desc" else col.asc())
     
-    items = db.execute(query.offset((page-1)*per_page).limit(per_page)).scalars().all()
+    # una fila extra permite saber si hay página siguiente sin depender del total
+    rows = db.execute(query.offset((page-1)*per_page).limit(per_page + 1)).scalars().all()
+    items = rows[:per_page]
     return {"total":total,
-            "pages":ceil(total/per_page), 
+            "pages":ceil(total/per_page) if total is not None else None, 
             "page":page, 
             "per_page":per_page, 
+            "has_next":len(rows) > per_page,
             "items":items}
         
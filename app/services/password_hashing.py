@@ -0,0 +1,82 @@
+
+# Hashing de contraseñas (argon2) en un pool de procesos acotado: el event loop nunca ejecuta argon2
+
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from app.core.config import settings
+from app.services.bounded_executor import BoundedExecutor
+
+# Cada proceso (también los workers) construye el suyo con los mismos parámetros.
+# Si cambian, verify_and_update devuelve el hash nuevo y el login lo guarda.
+password_hash = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
+
+
+def hash_password(plain: str) -> str:
+    return password_hash.hash(plain)
+
+
+def verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return password_hash.verify_and_update(plain, hashed)
+
+
+def hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servicio de autenticación saturado, inténtalo de nuevo",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)}
+    )
+
+
+class PasswordHasher:
+    # Con el pool lleno la petición recibe 503 en lugar de hacer cola
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pool = BoundedExecutor(workers, queue_limit, self._create_executor)
+
+    def _create_executor(self) -> Executor:
+        if self.workers > 0:
+            # spawn: los workers no heredan el event loop ni las conexiones abiertas
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # PASSWORD_HASH_WORKERS=0: hilos (argon2 libera el GIL), útil donde no hay procesos
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-hash")
+
+    async def hash(self, plain: str) -> str:
+        return await self.pool.run(hash_password, plain, busy=hashing_busy)
+
+    async def verify(self, plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        # (válida, hash nuevo si los parámetros de argon2 han cambiado)
+        return await self.pool.run(verify_and_update, plain, hashed, busy=hashing_busy)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        # uso síncrono (seeds): reparte el lote entre los workers
+        return list(self.pool.executor().map(hash_password, passwords))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.pool.in_flight,
+            "rejected": self.pool.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
@@ -0,0 +1,147 @@
+
+# Índice de texto completo para posts: FTS5 en SQLite, tsvector + GIN en Postgres
+
+import re
+from typing import Iterable, Literal
+from sqlalchemy import Engine, bindparam, column, false, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.post import PostORM
+
+SearchField = Literal["all", "title", "content"]
+
+FTS_TABLE = "posts_fts"
+TITLE_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+# Mismas expresiones que los índices GIN, con literales para que el planner los use
+_PG_CONFIG = literal_column("'simple'")
+_PG_TITLE_VECTOR = func.to_tsvector(_PG_CONFIG, func.coalesce(PostORM.title, literal_column("''")))
+_PG_CONTENT_VECTOR = func.to_tsvector(_PG_CONFIG, func.coalesce(PostORM.content, literal_column("''")))
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def _terms(query: str) -> list[str]:
+    # solo palabras: evita inyectar operadores de FTS5 / tsquery
+    return re.findall(r"\w+", query)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+            if exists:
+                return
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "title, content, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            # backfill de los posts que ya existían
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, content) SELECT id, title, content FROM posts"
+            ))
+        elif dialect == "postgresql":
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_posts_title_fts ON posts "
+                "USING GIN (to_tsvector('simple', coalesce(title, '')))"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_posts_content_fts ON posts "
+                "USING GIN (to_tsvector('simple', coalesce(content, '')))"
+            ))
+
+
+def index_posts(db: Session, posts: Iterable[PostORM]) -> None:
+    index_rows(db, [{"id": post.id, "title": post.title, "content": post.content} for post in posts])
+
+
+def index_rows(db: Session, rows: list[dict]) -> None:
+    # filas {id, title, content}; en Postgres el índice es de expresión y se mantiene solo
+    if not rows or _dialect(db.get_bind()) != "sqlite":
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": row["id"]} for row in rows])
+    db.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (:id, :title, :content)"), rows)
+
+
+def index_post(db: Session, post: PostORM) -> None:
+    index_posts(db, [post])
+
+
+def unindex_post(db: Session, post_id: int) -> None:
+    if _dialect(db.get_bind()) != "sqlite":
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": post_id})
+
+
+def _fts5_expression(query: str, field: SearchField) -> str:
+    terms = " AND ".join('"{}"*'.format(term.replace('"', '""')) for term in _terms(query))
+    columns = "title content" if field == "all" else field
+    return f"{{{columns}}} : ({terms})"
+
+
+def _pg_tsquery(query: str):
+    expression = " & ".join(f"{term}:*" for term in _terms(query))
+    return func.to_tsquery(_PG_CONFIG, bindparam("pg_tsquery", expression))
+
+
+def match_subquery(db: Session, query: str, field: SearchField = "all"):
+    # Devuelve (post_id, rank): rank más bajo = más relevante, para ordenar asc
+    dialect = _dialect(db.get_bind())
+
+    if not _terms(query):
+        return (
+            select(PostORM.id.label("post_id"), literal(0.0).label("rank"))
+            .where(false())
+            .subquery("post_matches")
+        )
+
+    if dialect == "sqlite":
+        fts_table = table(FTS_TABLE, column("rowid"))
+        fts = literal_column(FTS_TABLE)
+        return (
+            select(
+                fts_table.c.rowid.label("post_id"),
+                func.bm25(fts, TITLE_WEIGHT, CONTENT_WEIGHT).label("rank")
+            )
+            .where(fts.op("MATCH")(bindparam("fts_query", _fts5_expression(query, field))))
+            .subquery("post_matches")
+        )
+
+    if dialect == "postgresql":
+        tsquery = _pg_tsquery(query)
+        title_match = _PG_TITLE_VECTOR.op("@@")(tsquery)
+        content_match = _PG_CONTENT_VECTOR.op("@@")(tsquery)
+        title_rank = func.ts_rank(_PG_TITLE_VECTOR, tsquery) * TITLE_WEIGHT
+        content_rank = func.ts_rank(_PG_CONTENT_VECTOR, tsquery) * CONTENT_WEIGHT
+        if field == "title":
+            condition, rank = title_match, title_rank
+        elif field == "content":
+            condition, rank = content_match, content_rank
+        else:
+            condition, rank = or_(title_match, content_match), title_rank + content_rank
+        return (
+            select(PostORM.id.label("post_id"), (-rank).label("rank"))
+            .where(condition)
+            .subquery("post_matches")
+        )
+
+    # otros motores: sin índice, se mantiene el ilike de siempre
+    pattern = f"%{query}%"
+    if field == "title":
+        condition = PostORM.title.ilike(pattern)
+    elif field == "content":
+        condition = PostORM.content.ilike(pattern)
+    else:
+        condition = or_(PostORM.title.ilike(pattern), PostORM.content.ilike(pattern))
+    return (
+        select(PostORM.id.label("post_id"), literal(0.0).label("rank"))
+        .where(condition)
+        .subquery("post_matches")
+    )
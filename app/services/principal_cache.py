@@ -0,0 +1,99 @@
+
+# Caché de usuarios autenticados (id, rol, activo) para no consultar la BD en cada petición
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user_auth_epoch import UserAuthEpochORM
+from app.services.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str
+    is_active: bool = True
+
+
+principal_cache = TTLCache(max_size=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def _timestamp(value: datetime) -> float:
+    # las columnas DateTime guardan UTC sin zona
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class AuthEpochs:
+    # user_id -> último cambio de rol o de alta. El rol firmado en el JWT solo se acepta si el token
+    # es posterior; si no, se consulta la BD. No caduca con la caché de principals: se recarga de
+    # user_auth_epochs cada PRINCIPAL_CACHE_TTL_SECONDS para ver los cambios hechos en otros procesos
+    def __init__(self, reload_seconds: float):
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._epochs: Dict[int, float] = {}
+        self._next_reload: Optional[float] = None
+
+    def needs_reload(self) -> bool:
+        return self._next_reload is None or monotonic() >= self._next_reload
+
+    def load(self, rows: Iterable[Tuple[int, datetime]]) -> None:
+        # solo avanza: un cambio anotado mientras se leía la tabla no se pierde
+        with self._lock:
+            for user_id, changed_at in rows:
+                epoch = _timestamp(changed_at)
+                if epoch > self._epochs.get(user_id, 0.0):
+                    self._epochs[user_id] = epoch
+            self._next_reload = monotonic() + self.reload_seconds
+
+    def note(self, user_id: int, changed_at: datetime) -> None:
+        with self._lock:
+            self._epochs[user_id] = max(self._epochs.get(user_id, 0.0), _timestamp(changed_at))
+
+    def token_is_current(self, user_id: int, issued_at) -> bool:
+        # iat va en segundos enteros: un token del mismo segundo que el cambio tampoco vale
+        if not isinstance(issued_at, (int, float)) or self._next_reload is None:
+            return False
+        with self._lock:
+            return issued_at > self._epochs.get(user_id, 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epochs.clear()
+            self._next_reload = None
+
+
+auth_epochs = AuthEpochs(reload_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def principal_of(user) -> Principal:
+    return Principal(id=user.id, role=user.role, is_active=bool(user.is_active))
+
+
+def refresh_principal(db: Session, user) -> None:
+    # se quita ya y se publica el valor nuevo solo si la transacción se confirma. La época se anota
+    # en la BD (la leen los demás procesos) y aquí al momento: con rollback solo cuesta consultas de más
+    changed_at = datetime.utcnow()
+    db.merge(UserAuthEpochORM(user_id=user.id, changed_at=changed_at))
+    auth_epochs.note(user.id, changed_at)
+    principal_cache.discard(user.id)
+    db.info.setdefault("principal_pending", {})[user.id] = principal_of(user)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_principals(session: Session) -> None:
+    pending = session.info.pop("principal_pending", None)
+    if pending:
+        principal_cache.put_many(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_principals(session: Session, previous_transaction) -> None:
+    for user_id in session.info.pop("principal_pending", {}):
+        principal_cache.discard(user_id)
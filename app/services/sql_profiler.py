@@ -0,0 +1,145 @@
+
+# Perfilador SQL por petición (solo admin, con la cabecera X-Debug-SQL): sentencias, tiempos,
+# plan de ejecución opcional y sentencias repetidas (N+1). El informe se guarda por X-Request-ID.
+
+import threading
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from time import perf_counter
+from typing import List, Literal, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+ProfileMode = Literal["timings", "explain", "analyze"]
+
+current_profile: ContextVar[Optional["SqlProfile"]] = ContextVar("current_profile", default=None)
+
+
+def profile_mode(header: str) -> Optional[ProfileMode]:
+    value = header.strip().lower()
+    if value in ("explain", "analyze"):
+        return value
+    if value in ("1", "true", "yes", "timings"):
+        return "timings"
+    return None
+
+
+class SqlProfile:
+    def __init__(self, request_id: str, method: str, path: str, mode: ProfileMode):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.statements: List[dict] = []
+
+    def record(self, statement: str, parameters, seconds: float, executemany: bool, plan: Optional[List[str]]) -> None:
+        entry = {
+            "sql": statement,
+            "parameters": None if executemany else repr(parameters)[:300],
+            "executemany": executemany,
+            "duration_ms": round(seconds * 1000, 3),
+        }
+        if plan is not None:
+            entry["plan"] = plan
+        self.statements.append(entry)
+
+    def repeated(self) -> List[dict]:
+        # mismo texto SQL (los valores van como parámetros) ejecutado varias veces en una petición
+        threshold = settings.SQL_PROFILE_REPEAT_THRESHOLD
+        counts = Counter(entry["sql"] for entry in self.statements if not entry["executemany"])
+        return [
+            {
+                "sql": sql,
+                "count": count,
+                "total_ms": round(sum(e["duration_ms"] for e in self.statements if e["sql"] == sql), 3),
+            }
+            for sql, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def summary_header(self) -> str:
+        total = sum(entry["duration_ms"] for entry in self.statements)
+        return f"statements={len(self.statements)}; total_ms={total:.3f}; repeated={len(self.repeated())}"
+
+    def report(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "mode": self.mode,
+            "statement_count": len(self.statements),
+            "total_ms": round(sum(entry["duration_ms"] for entry in self.statements), 3),
+            "repeated": self.repeated(),
+            "statements": self.statements,
+        }
+
+
+class ProfileStore:
+    # últimos informes en memoria, acotados
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._reports: "OrderedDict[str, SqlProfile]" = OrderedDict()
+
+    def save(self, profile: SqlProfile) -> None:
+        with self._lock:
+            self._reports[profile.request_id] = profile
+            while len(self._reports) > self.max_size:
+                self._reports.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[SqlProfile]:
+        with self._lock:
+            return self._reports.get(request_id)
+
+    def recent(self) -> List[dict]:
+        with self._lock:
+            profiles = list(self._reports.values())
+        return [
+            {"request_id": p.request_id, "method": p.method, "path": p.path, "summary": p.summary_header()}
+            for p in reversed(profiles)
+        ]
+
+
+profile_store = ProfileStore(settings.SQL_PROFILE_MAX_REPORTS)
+
+
+def _explain(conn, statement: str, parameters, mode: ProfileMode) -> Optional[List[str]]:
+    # solo SELECT: EXPLAIN ANALYZE ejecuta la sentencia y no debe repetir escrituras
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if mode == "analyze" else "EXPLAIN "
+    else:
+        return None
+    # cursor del driver directamente: no pasa por los eventos ni por el perfilador
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [" | ".join(str(value) for value in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN no disponible: {type(e).__name__}: {e}"]
+    finally:
+        cursor.close()
+
+
+def attach_sql_profiler(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            context._profile_start = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        if profile is None or not hasattr(context, "_profile_start"):
+            return
+        seconds = perf_counter() - context._profile_start
+        plan = None
+        if profile.mode != "timings" and not executemany:
+            plan = _explain(conn, statement, parameters, profile.mode)
+        profile.record(statement, parameters, seconds, executemany, plan)
@@ -0,0 +1,104 @@
+
+# Diccionario de tags en memoria (nombre normalizado -> id) para la ruta de escritura.
+# Con varios workers, renombrar o borrar un tag sube la generación "tags" en la BD; la ruta de
+# escritura la lee (una consulta por clave primaria) y, si no es la que conoce, vacía su copia
+
+import threading
+from typing import Dict, Optional
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.cache_generation import CacheGenerationORM
+from app.models.tag import TagORM
+from app.services.ttl_cache import TTLCache
+
+TAG_GENERATION = "tags"
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()
+
+
+tag_cache = TTLCache(max_size=settings.TAG_CACHE_MAX_SIZE, ttl_seconds=settings.TAG_CACHE_TTL_SECONDS)
+
+# generación de la BD con la que se llenó tag_cache
+_synced = {"generation": None}
+_sync_lock = threading.Lock()
+
+
+def _db_generation(db: Session) -> int:
+    return db.execute(
+        select(CacheGenerationORM.value).where(CacheGenerationORM.name == TAG_GENERATION)
+    ).scalar() or 0
+
+
+def sync_tag_cache(db: Session) -> None:
+    # Antes de usar ids de la caché para escribir. La generación local de tag_cache queda anotada
+    # en la sesión: lo que esta transacción recuerde no entra si la caché se vacía mientras tanto
+    generation = _db_generation(db)
+    with _sync_lock:
+        if _synced["generation"] != generation:
+            tag_cache.clear()
+            _synced["generation"] = generation
+    db.info.setdefault("tag_cache_generation", tag_cache.generation)
+
+
+def bump_tag_generation(db: Session) -> None:
+    # en la misma transacción que el renombrado o el borrado: los demás procesos lo ven al confirmar
+    table = CacheGenerationORM.__table__
+    result = db.execute(
+        update(table).where(table.c.name == TAG_GENERATION).values(value=table.c.value + 1)
+    )
+    if result.rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(table).values(name=TAG_GENERATION, value=1))
+    except IntegrityError:
+        db.execute(update(table).where(table.c.name == TAG_GENERATION).values(value=table.c.value + 1))
+
+
+def warm_tag_cache(db: Session) -> int:
+    generation = _db_generation(db)
+    rows = db.execute(
+        select(func.lower(TagORM.name), TagORM.id).order_by(TagORM.id).limit(tag_cache.max_size)
+    ).all()
+    with _sync_lock:
+        tag_cache.clear()
+        _synced["generation"] = generation
+        tag_cache.put_many({name: tag_id for name, tag_id in rows})
+    return len(rows)
+
+
+def remember_tags(db: Session, mapping: Dict[str, int]) -> None:
+    # ids de una transacción sin confirmar: solo entran en la caché tras el commit
+    db.info.setdefault("tag_cache_pending", {}).update(mapping)
+
+
+def forget_tag(db: Session, name: str) -> None:
+    # se quita ya (como mucho provoca un fallo de caché) y otra vez tras el commit,
+    # por si otra petición la volvió a cargar con el valor antiguo mientras tanto
+    name = normalize_tag(name)
+    tag_cache.discard(name)
+    db.info.get("tag_cache_pending", {}).pop(name, None)
+    db.info.setdefault("tag_cache_forget", set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_tag_cache_changes(session: Session) -> None:
+    for name in session.info.pop("tag_cache_forget", ()):
+        tag_cache.discard(name)
+    generation: Optional[int] = session.info.pop("tag_cache_generation", None)
+    pending = session.info.pop("tag_cache_pending", None)
+    if pending:
+        tag_cache.put_many(pending, generation)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_tag_cache_changes(session: Session, previous_transaction) -> None:
+    session.info.pop("tag_cache_generation", None)
+    session.info.pop("tag_cache_pending", None)
+    for name in session.info.pop("tag_cache_forget", ()):
+        tag_cache.discard(name)
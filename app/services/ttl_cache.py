@@ -0,0 +1,64 @@
+
+# LRU acotado con TTL y seguro entre hilos, compartido por las cachés de proceso (tags, usuarios)
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class TTLCache:
+    # el TTL limita cuánto puede durar una entrada obsoleta escrita por otro proceso
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        # cambia con cada invalidación: una lectura de BD anterior no puede pisar el borrado
+        self.generation = 0
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        now = monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, mapping: Dict[Hashable, Any], generation: Optional[int] = None) -> None:
+        expires = monotonic() + self.ttl_seconds
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        self.put_many({key: value}, generation)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
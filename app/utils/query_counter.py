@@ -0,0 +1,45 @@
+
+# Guardas de número de consultas SQL para los tests: detectan N+1 al crecer la página
+
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List
+from sqlalchemy import event
+
+from app.core.db import async_engine, engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(*engines) -> Iterator[QueryCounter]:
+    targets = engines or (engine, async_engine.sync_engine)
+    counter = QueryCounter()
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter._before_cursor_execute)
+
+
+def assert_constant_queries(call: Callable[[int], object], sizes: Iterable[int] = (1, 10, 100), *engines) -> int:
+    # Ejecuta call(tamaño) para cada tamaño de página y falla si el número de sentencias cambia
+    counts = {}
+    for size in sizes:
+        with count_queries(*engines) as counter:
+            call(size)
+        counts[size] = counter.count
+    if len(set(counts.values())) > 1:
+        raise AssertionError(f"El número de consultas crece con el tamaño de página: {counts}")
+    return next(iter(counts.values()))
@@ -1,24 +1,124 @@
 
 from slugify import slugify as _slugify
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import bindparam, insert, or_, select, update
 
 from app.models.post import PostORM
+from app.models.slug_counter import SlugCounterORM
 
 def slugify_base(text: str) -> str:
     slug = _slugify(text, lowercase = True, separator ="-")
     return slug or "post"
-    
+
+
+def slug_for(base: str, number: int) -> str:
+    return base if number == 1 else f"{base}-{number}"
+
+
+def _highest_suffixes(db: Session, bases: List[str], lookup_chunk: int) -> Dict[str, int]:
+    # Solo la primera vez que aparece una base: el sufijo más alto que ya usan los posts.
+    # Es el único recorrido de slugs; después el contador basta
+    highest = {base: 0 for base in bases}
+    for start in range(0, len(bases), lookup_chunk):
+        chunk = bases[start:start + lookup_chunk]
+        slugs = db.execute(
+            select(PostORM.slug).where(or_(*[
+                or_(PostORM.slug == base, PostORM.slug.like(f"{base}-%"))
+                for base in chunk
+            ]))
+        ).scalars()
+        for slug in slugs:
+            if slug in highest:
+                highest[slug] = max(highest[slug], 1)
+                continue
+            base, _, suffix = slug.rpartition("-")
+            if base in highest and suffix.isdigit():
+                highest[base] = max(highest[base], int(suffix))
+    return highest
+
+
+def _create_counters(db: Session, bases: List[str], lookup_chunk: int) -> None:
+    rows = [{"base": base, "last": last} for base, last in _highest_suffixes(db, bases, lookup_chunk).items()]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(SlugCounterORM), row)
+            except IntegrityError:
+                pass
+        return
+    # si otra transacción creó el contador a la vez, se usa el suyo
+    db.execute(dialect_insert(SlugCounterORM).on_conflict_do_nothing(index_elements=["base"]), rows)
+
+
+def reserve_slug_numbers(db: Session, bases: Iterable[str], lookup_chunk: int = 200) -> Dict[str, int]:
+    # Reserva tantos números como apariciones de cada base y devuelve el primero de cada rango.
+    # El UPDATE last = last + n es atómico (bloquea la fila hasta el commit), así que dos altas
+    # simultáneas nunca reciben el mismo número y no hace falta volver a mirar los posts.
+    counts = Counter(bases)
+    if not counts:
+        return {}
+    table = SlugCounterORM.__table__
+    increment = (
+        update(table)
+        .where(table.c.base == bindparam("b_base"))
+        .values(last=table.c.last + bindparam("b_count"))
+    )
+    result = db.execute(increment, [{"b_base": base, "b_count": n} for base, n in counts.items()])
+    if result.rowcount != len(counts):
+        known = set(db.execute(select(table.c.base).where(table.c.base.in_(counts))).scalars())
+        missing = sorted(set(counts) - known)
+        if missing:
+            _create_counters(db, missing, lookup_chunk)
+            db.execute(increment, [{"b_base": base, "b_count": counts[base]} for base in missing])
+
+    last = dict(db.execute(select(table.c.base, table.c.last).where(table.c.base.in_(counts))).all())
+    return {base: last[base] - n + 1 for base, n in counts.items()}
+
 
 def ensure_unique_slug(db: Session, base_text:str) -> str:
     base = slugify_base(base_text)
-    existing = db.execute(select(PostORM.slug).where(PostORM.slug.like(f"{base}%"))).scalars().all()
-    if base not in existing:
-        return base
-    i = 2
-    candidate = f"{base}-{i}"
-    while candidate in existing:
-        i += 1
-        candidate = f"{base}-{i}"
-    return candidate
-        
\ No newline at end of file
+    return slug_for(base, reserve_slug_numbers(db, [base])[base])
+
+
+def _existing_slugs(db: Session, slugs: List[str], lookup_chunk: int) -> Set[str]:
+    found = set()
+    for start in range(0, len(slugs), lookup_chunk):
+        found.update(db.execute(select(PostORM.slug).where(PostORM.slug.in_(slugs[start:start + lookup_chunk]))).scalars())
+    return found
+
+
+def allocate_unique_slugs(db: Session, titles: List[str], lookup_chunk: int = 200, max_attempts: int = 5) -> List[str]:
+    # Slugs para un lote entero: un UPDATE en bloque sobre los contadores y reparto en memoria.
+    # El número de una base puede dar el slug de otra ("hello" -> hello-2, de un post "Hello 2"):
+    # los candidatos se comprueban con un IN y los que chocan piden el siguiente número, como
+    # los reintentos de create_post. Tras max_attempts se deja el último y la BD decide
+    bases = [slugify_base(title) for title in titles]
+    slugs: List[str] = [""] * len(bases)
+    pending = list(range(len(bases)))
+    used: Set[str] = set()
+    for _ in range(max_attempts):
+        next_number = reserve_slug_numbers(db, [bases[i] for i in pending], lookup_chunk)
+        for i in pending:
+            slugs[i] = slug_for(bases[i], next_number[bases[i]])
+            next_number[bases[i]] += 1
+        taken = _existing_slugs(db, [slugs[i] for i in pending], lookup_chunk)
+        retry = []
+        for i in pending:
+            # también choques dentro del propio lote
+            if slugs[i] in taken or slugs[i] in used:
+                retry.append(i)
+            else:
+                used.add(slugs[i])
+        pending = retry
+        if not pending:
+            break
+    return slugs
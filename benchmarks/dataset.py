@@ -0,0 +1,27 @@
+
+# Dataset sintético para los benchmarks: el generador de app.seeds más un usuario conocido para login
+
+from typing import Dict
+
+from sqlalchemy import Engine, insert
+from sqlalchemy.orm import Session
+
+from app.core.db import Base
+from app.models import UserORM
+from app.seeds.generate import generate
+from app.services.password_hashing import hash_password
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def build_dataset(engine: Engine, posts: int, seed: int = 42, chunk_size: int = 10_000) -> Dict[str, int]:
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.execute(insert(UserORM), [
+            {"email": BENCH_EMAIL, "full_name": "Bench", "role": "admin", "hashed_password": hash_password(BENCH_PASSWORD)}
+        ])
+        db.commit()
+        return generate(db, users=50, categories=20, tags=500, posts=posts, seed=seed, chunk_size=chunk_size, password=BENCH_PASSWORD)
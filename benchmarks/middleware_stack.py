@@ -0,0 +1,106 @@
+
+# Benchmark del stack de middleware: los cuatro @app.middleware("http") anteriores frente al ASGI puro.
+#   python -m benchmarks.middleware_stack --requests 5000 --concurrency 50
+
+import asyncio
+import contextlib
+import io
+import uuid
+from time import perf_counter
+
+import httpx
+import typer
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core.middleware import register_middleware
+
+app = typer.Typer(help="Peticiones/segundo con el stack anterior y con el nuevo")
+
+
+def register_legacy_middleware(app: FastAPI):
+    # copia del register_middleware anterior (cuatro BaseHTTPMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start = perf_counter()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(perf_counter() - start)
+        return response
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        method = request.method
+        url = request.url
+        print(f"ENTRADA: {request.method} {request.url}")
+        response = await call_next(request)
+        print(f"SALIDA: {method} {url} - {response.status_code}")
+        return response
+
+    @app.middleware("http")
+    async def add_request_id_header(request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    @app.middleware("http")
+    async def block_ip_middleware(request: Request, call_next):
+        if request.client.host in {"192.168.1.100"}:
+            raise HTTPException(status_code=403, detail="Access forbidden from your IP address.")
+        return await call_next(request)
+
+
+def build_app(register) -> FastAPI:
+    bench_app = FastAPI()
+    register(bench_app)
+
+    @bench_app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return bench_app
+
+
+async def requests_per_second(bench_app: FastAPI, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=bench_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/ping")
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/ping")
+                assert response.status_code == 200 and "x-request-id" in response.headers
+
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (perf_counter() - start)
+
+
+@app.command()
+def main(
+    requests: int = typer.Option(5000, help="Peticiones por ronda"),
+    concurrency: int = typer.Option(50, help="Peticiones simultáneas"),
+    rounds: int = typer.Option(3, help="Rondas por stack (se queda la mejor)"),
+):
+    stacks = {"anterior": register_legacy_middleware, "asgi": register_middleware}
+    results = {}
+    for name, register in stacks.items():
+        bench_app = build_app(register)
+        # los print de log van a un buffer: se mide el middleware, no la terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = max(asyncio.run(requests_per_second(bench_app, requests, concurrency)) for _ in range(rounds))
+        typer.echo(f"{name:>9}: {results[name]:9.0f} req/s")
+    typer.echo(f"  mejora: x{results['asgi'] / results['anterior']:.2f}")
+
+
+if __name__ == "__main__":
+    app()
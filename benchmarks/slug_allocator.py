@@ -0,0 +1,112 @@
+
+# Benchmark del reparto de slugs: coste por alta según cuántos posts comparten ya el slug base.
+#   python -m benchmarks.slug_allocator --collisions 10,100,1000,10000 --allocations 200 --threads 8
+
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List
+
+import typer
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.db import Base
+from app.models import PostORM
+from app.utils.slugify_utils import ensure_unique_slug, slugify_base
+
+app = typer.Typer(help="Benchmark del reparto de slugs únicos")
+
+BASE_TITLE = "Mismo titulo"
+
+
+def legacy_unique_slug(db: Session, base_text: str) -> str:
+    # algoritmo anterior: carga todos los slugs LIKE 'base%' y prueba base-2, base-3, ...
+    base = slugify_base(base_text)
+    existing = db.execute(select(PostORM.slug).where(PostORM.slug.like(f"{base}%"))).scalars().all()
+    if base not in existing:
+        return base
+    i = 2
+    while f"{base}-{i}" in existing:
+        i += 1
+    return f"{base}-{i}"
+
+
+def make_database(path: Path, collisions: int) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path.as_posix()}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    base = slugify_base(BASE_TITLE)
+    rows = [{"title": f"{BASE_TITLE} {i}", "slug": base if i == 1 else f"{base}-{i}"} for i in range(1, collisions + 1)]
+    with engine.begin() as conn:
+        if rows:
+            conn.execute(insert(PostORM), rows)
+    return sessionmaker(bind=engine)
+
+
+def run_allocations(Session_: sessionmaker, allocator: Callable[[Session, str], str], allocations: int, offset: int) -> List[float]:
+    timings = []
+    with Session_() as db:
+        for i in range(allocations):
+            start = perf_counter()
+            slug = allocator(db, BASE_TITLE)
+            db.add(PostORM(title=f"bench {offset + i}", slug=slug))
+            db.commit()
+            timings.append(perf_counter() - start)
+    return timings
+
+
+def concurrent_allocations(Session_: sessionmaker, threads: int, per_thread: int) -> int:
+    # altas simultáneas con el mismo título base; devuelve cuántos slugs se repitieron
+    slugs: List[str] = []
+    lock = threading.Lock()
+
+    def worker(n: int):
+        for i in range(per_thread):
+            with Session_() as db:
+                slug = ensure_unique_slug(db, BASE_TITLE)
+                db.add(PostORM(title=f"concurrente {n}-{i}", slug=slug))
+                db.commit()
+            with lock:
+                slugs.append(slug)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len(slugs) - len(set(slugs))
+
+
+def us(seconds: float) -> str:
+    return f"{seconds * 1_000_000:9.1f}µs"
+
+
+@app.command()
+def main(
+    collisions: str = typer.Option("10,100,1000,10000", help="Posts previos con el mismo slug base"),
+    allocations: int = typer.Option(200, help="Altas medidas por escenario"),
+    threads: int = typer.Option(8, help="Hilos para la prueba de concurrencia (0 la omite)"),
+):
+    sizes = [int(size) for size in collisions.split(",") if size.strip()]
+    typer.echo(f"{'colisiones':>10} {'contador 1ª':>12} {'contador p50':>12} {'anterior p50':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            counter_db = make_database(Path(tmp) / f"counter-{size}.db", size)
+            legacy_db = make_database(Path(tmp) / f"legacy-{size}.db", size)
+            counter = run_allocations(counter_db, ensure_unique_slug, allocations, 0)
+            legacy = run_allocations(legacy_db, legacy_unique_slug, allocations, 0)
+            # la primera alta de cada base crea el contador (único recorrido de slugs)
+            steady = sorted(counter[1:]) or counter
+            typer.echo(f"{size:>10} {us(counter[0]):>12} {us(steady[len(steady) // 2]):>12} {us(sorted(legacy)[len(legacy) // 2]):>12}")
+
+        if threads:
+            Session_ = make_database(Path(tmp) / "concurrent.db", 100)
+            duplicated = concurrent_allocations(Session_, threads, max(1, allocations // threads))
+            typer.echo(f"concurrencia: {threads} hilos, slugs repetidos = {duplicated}")
+            if duplicated:
+                raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
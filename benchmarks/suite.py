@@ -0,0 +1,383 @@
+
+# Suite de benchmarks de la API: create_app() sobre un dataset generado, cliente ASGI en proceso,
+# throughput y p50/p95/p99 por escenario, resultados en JSON y comparación con una línea base.
+#
+#   python -m benchmarks.suite run --size 10k --out benchmarks/baselines/10k.json
+#   python -m benchmarks.suite run --size 10k --baseline benchmarks/baselines/10k.json --threshold 0.15
+#   python -m benchmarks.suite compare benchmarks/baselines/10k.json benchmarks/results/10k-ultimo.json
+
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import tempfile
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter, process_time
+from typing import Callable, Dict, List, Optional
+
+import typer
+
+app = typer.Typer(help="Benchmarks de la API (throughput y percentiles de latencia)")
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCH_DIR / ".data"
+RESULTS_DIR = BENCH_DIR / "results"
+ROOT_DIR = BENCH_DIR.parent
+
+
+def tiny_png() -> bytes:
+    # PNG válido de 1x1 para /upload/save
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00")) + chunk(b"IEND", b"")
+
+
+@dataclass
+class Scenario:
+    name: str
+    # (cliente, índice de la petición) -> respuesta
+    request: Callable
+    requests: int
+    concurrency: int
+    expected: int = 200
+
+
+def percentile_summary(latencies: List[float]) -> Dict[str, float]:
+    if len(latencies) < 2:
+        value = latencies[0] * 1000 if latencies else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+async def run_scenario(client, scenario: Scenario, warmup: int) -> dict:
+    for i in range(warmup):
+        await scenario.request(client, -1 - i)
+    latencies: List[float] = []
+    sizes: List[int] = []
+    wire: List[int] = []
+    errors = 0
+    counter = iter(range(scenario.requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = perf_counter()
+            response = await scenario.request(client, i)
+            latencies.append(perf_counter() - start)
+            sizes.append(len(response.content))
+            # bytes tal como llegan (comprimidos si se negoció Content-Encoding)
+            wire.append(response.num_bytes_downloaded)
+            if response.status_code != scenario.expected:
+                errors += 1
+
+    start = perf_counter()
+    # CPU del proceso (app y cliente comparten proceso): sirve para comparar entre ejecuciones
+    cpu_start = process_time()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    elapsed = perf_counter() - start
+    cpu = process_time() - cpu_start
+    return {
+        "requests": scenario.requests,
+        "concurrency": scenario.concurrency,
+        "errors": errors,
+        "rps": round(scenario.requests / elapsed, 2),
+        **percentile_summary(latencies),
+        "bytes_avg": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "wire_bytes_avg": round(sum(wire) / len(wire)) if wire else 0,
+        "cpu_ms_per_req": round(cpu * 1000 / scenario.requests, 3),
+    }
+
+
+def build_scenarios(posts: int, requests: int, concurrency: int, seed: int, token: str, png: bytes,
+                    slugs: List[str], tag_names: List[str], media_urls: List[str]) -> List[Scenario]:
+    from app.seeds.generate import WORDS
+    from benchmarks.dataset import BENCH_EMAIL, BENCH_PASSWORD
+
+    rng = random.Random(seed)
+    auth = {"Authorization": f"Bearer {token}"}
+    pages = max(posts // 20, 1)
+    terms = [rng.choice(WORDS) for _ in range(requests)]
+
+    async def list_offset(client, i):
+        return await client.get("/posts", params={"page": rng.randint(1, pages), "limit": 20})
+
+    async def list_large(client, i):
+        return await client.get("/posts", params={"page": rng.randint(1, max(posts // 100, 1)), "limit": 100})
+
+    async def list_search(client, i):
+        return await client.get("/posts", params={"q": terms[i % len(terms)], "limit": 20})
+
+    async def by_tags(client, i):
+        # tags poco frecuentes: los primeros aparecen en casi todos los posts y el endpoint no pagina
+        return await client.get("/posts/by-tags", params={"tags": rng.sample(tag_names, 2)})
+
+    async def by_slug(client, i):
+        return await client.get(f"/posts/post/{slugs[i % len(slugs)]}")
+
+    async def login(client, i):
+        return await client.post("/api/v1/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+
+    async def create_post(client, i):
+        data = {"title": f"benchmark {seed} {i} {rng.random()}"[:100], "content": " ".join(rng.choices(WORDS, k=40)),
+                "category_id": 1, "tags": [tag_names[0], f"{tag_names[1]},benchmark"]}
+        return await client.post("/posts", data=data, headers=auth)
+
+    async def upload_save(client, i):
+        response = await client.post("/upload/save", files={"file": ("bench.png", png, "image/png")})
+        if response.status_code == 200:
+            media_urls.append(response.json()["url"])
+        return response
+
+    return [
+        Scenario("list_posts_offset", list_offset, requests, concurrency),
+        Scenario("list_posts_limit100", list_large, requests, concurrency),
+        Scenario("list_posts_search", list_search, requests, concurrency),
+        Scenario("filter_posts_by_tags", by_tags, max(requests // 4, 1), concurrency),
+        Scenario("get_by_slug", by_slug, requests, concurrency),
+        # argon2 en el pool de hashing: pocas peticiones bastan
+        Scenario("login", login, max(requests // 10, 1), concurrency),
+        Scenario("create_post", create_post, requests, concurrency, expected=201),
+        Scenario("upload_save", upload_save, requests, concurrency),
+    ]
+
+
+def sample_dataset(posts: int, requests: int, seed: int):
+    # slugs al azar y tags de popularidad media (los primeros están en casi todos los posts y by-tags no pagina)
+    from sqlalchemy import select
+    from app.core.db import engine
+    from app.models import PostORM, TagORM
+
+    rng = random.Random(seed)
+    ids = [rng.randint(1, posts) for _ in range(requests)]
+    with engine.connect() as conn:
+        slugs = conn.execute(select(PostORM.slug).where(PostORM.id.in_(ids))).scalars().all()
+        tag_names = conn.execute(select(TagORM.name).order_by(TagORM.id).offset(200).limit(300)).scalars().all()
+    return slugs, tag_names
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def schema_fingerprint() -> str:
+    # el dataset en caché se regenera si cambia el esquema de los modelos
+    import hashlib
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateTable
+    from app.core.db import Base
+    import app.models  # noqa: F401
+
+    ddl = "\n".join(str(CreateTable(table).compile(dialect=sqlite.dialect())) for table in Base.metadata.sorted_tables)
+    return hashlib.sha1(ddl.encode()).hexdigest()[:8]
+
+
+def dataset_path(size: str, seed: int) -> Path:
+    return DATA_DIR / f"blog-{size}-{seed}-{schema_fingerprint()}.db"
+
+
+def ensure_dataset(size: str, seed: int) -> Path:
+    from sqlalchemy import create_engine
+    from benchmarks.dataset import SIZES, build_dataset
+
+    path = dataset_path(size, seed)
+    if path.exists():
+        return path
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    typer.echo(f"generando dataset {size} ({SIZES[size]} posts)...")
+    start = perf_counter()
+    engine = create_engine(f"sqlite:///{partial.as_posix()}")
+    build_dataset(engine, SIZES[size], seed=seed)
+    engine.dispose()
+    partial.rename(path)
+    typer.echo(f"dataset listo en {perf_counter() - start:.1f}s: {path}")
+    return path
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> List[str]:
+    # regresión: p95 sube o rps baja más que el umbral relativo
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> {now['p95_ms']:.2f}ms")
+        if before["rps"] and now["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {before['rps']:.1f} -> {now['rps']:.1f}")
+    return regressions
+
+
+def print_results(results: dict, baseline: Optional[dict] = None) -> None:
+    typer.echo(f"{'escenario':<22}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'bytes':>9}{'wire':>9}{'cpu ms':>8}{'err':>5}{'Δp95':>9}")
+    for name, r in results["scenarios"].items():
+        delta = ""
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before and before["p95_ms"]:
+            delta = f"{(r['p95_ms'] / before['p95_ms'] - 1) * 100:+.1f}%"
+        typer.echo(
+            f"{name:<22}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['bytes_avg']:>9}{r.get('wire_bytes_avg', r['bytes_avg']):>9}{r.get('cpu_ms_per_req', 0):>8.2f}{r['errors']:>5}{delta:>9}"
+        )
+
+
+@app.command()
+def dataset(size: str = typer.Option("10k", help="10k, 100k o 1m"), seed: int = typer.Option(42)):
+    """Genera (o reutiliza) el dataset de un tamaño."""
+    ensure_dataset(size, seed)
+
+
+@app.command()
+def run(
+    size: str = typer.Option("10k", help="10k, 100k o 1m"),
+    seed: int = typer.Option(42, help="Semilla del dataset y de las peticiones"),
+    requests: int = typer.Option(200, help="Peticiones por escenario (login y by-tags usan menos)"),
+    concurrency: int = typer.Option(10, help="Peticiones simultáneas"),
+    warmup: int = typer.Option(5, help="Peticiones de calentamiento por escenario"),
+    only: Optional[str] = typer.Option(None, help="Escenarios separados por comas"),
+    out: Optional[Path] = typer.Option(None, help="Fichero JSON de resultados"),
+    baseline: Optional[Path] = typer.Option(None, help="Línea base con la que comparar"),
+    threshold: float = typer.Option(0.15, help="Regresión relativa tolerada"),
+    encoding: str = typer.Option("identity", help="Accept-Encoding del cliente (identity, gzip, br, zstd...)"),
+):
+    """Ejecuta los escenarios contra una copia del dataset."""
+    with tempfile.TemporaryDirectory() as tmp:
+        work_db = Path(tmp) / "blog.db"
+        # la configuración se lee al importar la app: el entorno va antes de cualquier import de app.*
+        os.environ["DATABASE_URL"] = f"sqlite:///{work_db.as_posix()}"
+        os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+        os.environ.setdefault("ACCESS_LOG_PATH", str(Path(tmp) / "access.log"))
+        source = ensure_dataset(size, seed)
+        shutil.copyfile(source, work_db)
+        results = asyncio.run(_run(size, seed, requests, concurrency, warmup, only, encoding))
+
+    print_results(results, json.loads(baseline.read_text()) if baseline else None)
+    out = out or RESULTS_DIR / f"{size}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    typer.echo(f"resultados: {out}")
+    if baseline:
+        regressions = compare_results(json.loads(baseline.read_text()), results, threshold)
+        for line in regressions:
+            typer.echo(f"REGRESIÓN {line}")
+        if regressions:
+            raise typer.Exit(code=1)
+
+
+async def _run(size: str, seed: int, requests: int, concurrency: int, warmup: int, only: Optional[str], encoding: str = "identity") -> dict:
+    import httpx
+    from benchmarks.dataset import BENCH_EMAIL, BENCH_PASSWORD, SIZES
+    from app.main import create_app
+    from app.services.password_hashing import password_hasher
+
+    api = create_app()
+    media_urls: List[str] = []
+    selected = {name.strip() for name in only.split(",")} if only else None
+    transport = httpx.ASGITransport(app=api)
+    try:
+        # Accept-Encoding explícito: httpx pide gzip/br/zstd por defecto y los resultados no serían comparables
+        headers = {"Accept-Encoding": encoding}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120, headers=headers) as client:
+            login = await client.post("/api/v1/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+            login.raise_for_status()
+            token = login.json()["access_token"]
+            slugs, tag_names = sample_dataset(SIZES[size], requests, seed)
+            scenarios = build_scenarios(SIZES[size], requests, concurrency, seed, token, tiny_png(), slugs, tag_names, media_urls)
+            results = {}
+            for scenario in scenarios:
+                if selected and scenario.name not in selected:
+                    continue
+                results[scenario.name] = await run_scenario(client, scenario, warmup)
+                typer.echo(f"  {scenario.name}: {results[scenario.name]['rps']} req/s")
+    finally:
+        password_hasher.shutdown()
+        # las subidas del benchmark no se quedan en app/media
+        for url in media_urls:
+            (ROOT_DIR / "app" / url.lstrip("/")).unlink(missing_ok=True)
+
+    import sqlalchemy
+    return {
+        "meta": {
+            "size": size,
+            "posts": SIZES[size],
+            "seed": seed,
+            "concurrency": concurrency,
+            "encoding": encoding,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "scenarios": results,
+    }
+
+
+@app.command()
+def compression(
+    size: str = typer.Option("10k", help="10k, 100k o 1m"),
+    seed: int = typer.Option(42),
+    requests: int = typer.Option(200, help="Peticiones por escenario"),
+    concurrency: int = typer.Option(10),
+    warmup: int = typer.Option(5),
+    encodings: str = typer.Option("identity,gzip,br,zstd", help="Codificaciones a comparar"),
+    only: str = typer.Option("list_posts_limit100,filter_posts_by_tags", help="Escenarios con respuestas grandes"),
+):
+    """CPU frente a bytes ahorrados por cada codificación en las respuestas JSON grandes."""
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_db = Path(tmp) / "blog.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{work_db.as_posix()}"
+        os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+        os.environ.setdefault("ACCESS_LOG_PATH", str(Path(tmp) / "access.log"))
+        shutil.copyfile(ensure_dataset(size, seed), work_db)
+        for encoding in [name.strip() for name in encodings.split(",") if name.strip()]:
+            typer.echo(f"[{encoding}]")
+            runs[encoding] = asyncio.run(_run(size, seed, requests, concurrency, warmup, only, encoding))["scenarios"]
+
+    base = runs.get("identity")
+    typer.echo(f"{'escenario':<22}{'encoding':<10}{'rps':>9}{'p95':>9}{'wire':>10}{'ratio':>8}{'cpu ms':>8}{'Δcpu ms':>9}")
+    for encoding, scenarios in runs.items():
+        for name, r in scenarios.items():
+            ratio = r["wire_bytes_avg"] / base[name]["wire_bytes_avg"] if base and base[name]["wire_bytes_avg"] else 1.0
+            extra_cpu = r["cpu_ms_per_req"] - base[name]["cpu_ms_per_req"] if base else 0.0
+            typer.echo(f"{name:<22}{encoding:<10}{r['rps']:>9.1f}{r['p95_ms']:>9.2f}{r['wire_bytes_avg']:>10}{ratio:>8.3f}{r['cpu_ms_per_req']:>8.2f}{extra_cpu:>+9.2f}")
+
+
+@app.command()
+def compare(
+    baseline: Path = typer.Argument(..., help="JSON de referencia"),
+    current: Path = typer.Argument(..., help="JSON a comparar"),
+    threshold: float = typer.Option(0.15, help="Regresión relativa tolerada"),
+):
+    """Compara dos ficheros de resultados y falla si hay regresiones."""
+    before = json.loads(baseline.read_text())
+    now = json.loads(current.read_text())
+    print_results(now, before)
+    regressions = compare_results(before, now, threshold)
+    for line in regressions:
+        typer.echo(f"REGRESIÓN {line}")
+    if regressions:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+# BD propia de los tests: tiene que estar fijada antes de importar app.core.db
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='blog-tests-'), 'blog.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.core.db import SessionLocal
+    from app.main import app
+    from app.seeds.generate import generate
+
+    with SessionLocal() as db:
+        generate(db, users=20, categories=5, tags=30, posts=300, seed=7)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    # token firmado directamente para un usuario generado: sin pasar por argon2
+    from app.core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token(sub='1')}"}
+
+
+@pytest.fixture
+def media_dir(client, tmp_path, monkeypatch):
+    # con la app (y sus tablas) ya creada; archivos en un directorio temporal
+    from app.services import file_storage
+
+    monkeypatch.setattr(file_storage, "MEDIA_DIR", str(tmp_path / "media"))
+    monkeypatch.setattr(file_storage, "TRASH_DIR", str(tmp_path / "media-trash"))
+    return tmp_path / "media"
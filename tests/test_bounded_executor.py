@@ -0,0 +1,52 @@
+# Pool acotado: límite de tareas a la vez y recuento de las que terminan o se cancelan
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.bounded_executor import BoundedExecutor
+
+
+def single_thread_pool(queue_limit: int) -> BoundedExecutor:
+    return BoundedExecutor(1, queue_limit, lambda: ThreadPoolExecutor(max_workers=1))
+
+
+def test_rejects_when_full_and_releases_finished_tasks():
+    pool = single_thread_pool(queue_limit=1)
+    gate = threading.Event()
+    running = pool.submit(gate.wait)
+    queued = pool.submit(gate.wait)
+    assert pool.submit(gate.wait) is None
+    assert (pool.in_flight, pool.rejected) == (2, 1)
+
+    gate.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    assert pool.in_flight == 0
+    pool.shutdown()
+
+
+def test_shutdown_stops_counting_cancelled_tasks():
+    pool = single_thread_pool(queue_limit=3)
+    gate = threading.Event()
+    pool.submit(gate.wait)
+    queued = [pool.submit(gate.wait) for _ in range(3)]
+    assert pool.in_flight == 4
+
+    threading.Timer(0.1, gate.set).start()
+    pool.shutdown()
+    assert all(future.cancelled() for future in queued)
+    assert pool.in_flight == 0
+
+
+def test_run_raises_busy_error_when_full():
+    pool = single_thread_pool(queue_limit=0)
+    gate = threading.Event()
+    pool.submit(gate.wait)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.run(sum, [1, 2], busy=lambda: RuntimeError("lleno")))
+    gate.set()
+    pool.shutdown()
@@ -0,0 +1,34 @@
+# Lectura de NDJSON por trozos: límite de tamaño por línea e índices de los elementos
+
+import asyncio
+import json
+
+from app.services.bulk_ingest import MAX_ITEM_BYTES, iter_ndjson
+
+
+def read_ndjson(*chunks: bytes) -> list:
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [entry async for entry in iter_ndjson(source())]
+
+    return asyncio.run(collect())
+
+
+def test_complete_lines_are_yielded_before_an_oversized_tail():
+    entries = read_ndjson(b'{"title":"ok"}\n' + b"x" * (MAX_ITEM_BYTES + 1))
+    assert entries == [(0, {"title": "ok"}, None), (1, None, "Línea demasiado grande")]
+
+
+def test_oversized_line_split_across_chunks_is_rejected():
+    line = json.dumps({"content": "x" * (MAX_ITEM_BYTES + 200_000)}).encode()
+    half = len(line) // 2
+    entries = read_ndjson(line[:half], line[half:] + b'\n{"title":"siguiente"}\n')
+    assert entries == [(0, None, "Línea demasiado grande"), (1, {"title": "siguiente"}, None)]
+
+
+def test_oversized_last_line_without_newline_is_rejected():
+    entries = read_ndjson(b'{"title":"ok"}\n', b"x" * (MAX_ITEM_BYTES // 2), b"x" * (MAX_ITEM_BYTES // 2 + 1))
+    assert entries == [(0, {"title": "ok"}, None), (1, None, "Línea demasiado grande")]
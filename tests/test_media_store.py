@@ -0,0 +1,159 @@
+# Almacén por contenido: refcount de los blobs, escritura deduplicada y borrado del último uso
+
+import io
+import os
+import time
+
+from PIL import Image
+from sqlalchemy import select
+from starlette.datastructures import UploadFile
+
+from app.core.db import SessionLocal
+from app.models import MediaBlobORM
+from app.services.file_storage import detach_blob_files, inspect_upload, purge_blob_files, restore_blob_files, store_upload
+from app.services.image_variants import image_pipeline
+from app.services.media_store import acquire_media, release_media
+
+
+def png_bytes(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=len(data))
+
+
+def stored_blob(data: bytes) -> dict:
+    file = upload(data)
+    saved = inspect_upload(file)
+    store_upload(file, saved)
+    return saved
+
+
+def refcount(digest: str):
+    with SessionLocal() as db:
+        return db.execute(select(MediaBlobORM.refcount).where(MediaBlobORM.digest == digest)).scalar_one_or_none()
+
+
+def wait_for_pipeline():
+    for _ in range(200):
+        if image_pipeline.stats()["pending"] == 0:
+            return
+        time.sleep(0.02)
+
+
+def test_identical_upload_skips_write(media_dir):
+    data = png_bytes((1, 2, 3))
+    first, second = upload(data), upload(data)
+    saved = inspect_upload(first)
+    assert store_upload(first, saved) is True
+    mtime = os.stat(saved["path"]).st_mtime_ns
+
+    again = inspect_upload(second)
+    assert again["path"] == saved["path"]
+    assert store_upload(second, again) is False
+    assert os.stat(saved["path"]).st_mtime_ns == mtime
+    assert os.listdir(os.path.dirname(saved["path"])) == [os.path.basename(saved["path"])]
+
+
+def test_acquire_and_release_track_references(media_dir):
+    saved = stored_blob(png_bytes((4, 5, 6)))
+    with SessionLocal() as db:
+        acquire_media(db, [saved["url"], saved["url"], "/media/legacy.png", None])
+        db.commit()
+    assert refcount(saved["sha256"]) == 2
+
+    with SessionLocal() as db:
+        assert release_media(db, [saved["url"]]) == []
+        db.commit()
+    assert refcount(saved["sha256"]) == 1
+
+    with SessionLocal() as db:
+        assert release_media(db, [saved["url"]]) == [saved["filename"]]
+        db.rollback()
+    # con rollback la fila sigue ahí
+    assert refcount(saved["sha256"]) == 1
+
+    with SessionLocal() as db:
+        assert release_media(db, [saved["url"]]) == [saved["filename"]]
+        db.commit()
+    assert refcount(saved["sha256"]) is None
+
+
+def test_detached_files_are_restored_or_purged(media_dir):
+    saved = stored_blob(png_bytes((7, 8, 9)))
+    derivative = saved["path"].replace(".png", "-320.webp")
+    open(derivative, "wb").close()
+
+    moved = detach_blob_files([saved["filename"]])
+    assert len(moved) == 2 and not os.path.exists(saved["path"]) and not os.path.exists(derivative)
+    restore_blob_files(moved)
+    assert os.path.exists(saved["path"]) and os.path.exists(derivative)
+
+    purge_blob_files(detach_blob_files([saved["filename"]]))
+    assert not os.listdir(os.path.dirname(saved["path"]))
+    assert not os.listdir(media_dir.parent / "media-trash")
+
+
+def test_upload_after_release_rewrites_the_blob(media_dir):
+    data = png_bytes((10, 11, 12))
+    saved = stored_blob(data)
+    with SessionLocal() as db:
+        acquire_media(db, [saved["url"]])
+        db.commit()
+    with SessionLocal() as db:
+        moved = detach_blob_files(release_media(db, [saved["url"]]))
+        db.commit()
+    purge_blob_files(moved)
+
+    with SessionLocal() as db:
+        file = upload(data)
+        acquire_media(db, [saved["url"]])
+        assert store_upload(file, inspect_upload(file)) is True
+        db.commit()
+    assert os.path.exists(saved["path"]) and refcount(saved["sha256"]) == 1
+
+
+def create_post_with_image(client, auth_headers, title: str, data: bytes) -> dict:
+    response = client.post(
+        "/posts",
+        data={"title": title, "content": "contenido con imagen compartida", "category_id": 1},
+        files={"image": ("imagen.png", data, "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_delete_post_removes_blob_with_last_reference(client, auth_headers, media_dir):
+    data = png_bytes((13, 14, 15))
+    first = create_post_with_image(client, auth_headers, "Imagen compartida uno", data)
+    second = create_post_with_image(client, auth_headers, "Imagen compartida dos", data)
+    assert first["image_url"] == second["image_url"]
+    wait_for_pipeline()
+    path = media_dir / first["image_url"][len("/media/"):]
+    digest = path.stem
+
+    assert client.delete(f"/posts/{first['id']}", headers=auth_headers).status_code == 202
+    assert path.exists() and refcount(digest) == 1
+
+    assert client.delete(f"/posts/{second['id']}", headers=auth_headers).status_code == 202
+    assert not path.exists() and not os.listdir(path.parent) and refcount(digest) is None
+
+
+def test_delete_post_succeeds_when_files_cannot_be_removed(client, auth_headers, media_dir, monkeypatch):
+    post = create_post_with_image(client, auth_headers, "Imagen protegida", png_bytes((16, 17, 18)))
+    wait_for_pipeline()
+    path = media_dir / post["image_url"][len("/media/"):]
+
+    def forbidden(*args):
+        raise PermissionError(args[0])
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", forbidden)
+        assert client.delete(f"/posts/{post['id']}", headers=auth_headers).status_code == 202
+    # el borrado se confirma; el archivo queda huérfano y una subida igual lo reutiliza
+    assert client.get(f"/posts/{post['id']}").status_code == 404
+    assert path.exists() and refcount(path.stem) is None
@@ -0,0 +1,74 @@
+# El número de sentencias SQL no puede crecer con el tamaño de la página (N+1)
+
+from sqlalchemy import func, select
+
+from app.core.db import SessionLocal
+from app.models import TagORM, post_tags
+from app.utils.query_counter import assert_constant_queries
+
+PAGE_SIZES = (1, 10, 100)
+
+
+def get_json(client, url, **params):
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def list_page(client, size, **params):
+    items = get_json(client, "/posts", limit=size, **params)["items"]
+    assert len(items) == size
+    return items
+
+
+def tags_by_popularity():
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(TagORM.name, func.count())
+            .join(post_tags, post_tags.c.tag_id == TagORM.id)
+            .group_by(TagORM.id)
+            .order_by(func.count().desc(), TagORM.id)
+        ).all()
+    return [name for name, _ in rows]
+
+
+def posts_by_tag_count():
+    # un post por cada número distinto de tags
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(post_tags.c.post_id, func.count()).group_by(post_tags.c.post_id)
+        ).all()
+    return {count: post_id for post_id, count in rows}
+
+
+def test_list_queries_do_not_grow_with_page_size(client):
+    assert_constant_queries(lambda size: list_page(client, size), PAGE_SIZES)
+
+
+def test_cursor_list_queries_do_not_grow_with_page_size(client):
+    assert_constant_queries(lambda size: list_page(client, size, pagination="cursor"), PAGE_SIZES)
+
+
+def test_search_queries_do_not_grow_with_page_size(client):
+    assert_constant_queries(lambda size: list_page(client, size, q="fastapi"), PAGE_SIZES)
+
+
+def test_detail_queries_do_not_grow_with_tag_count(client):
+    posts = posts_by_tag_count()
+    assert len(posts) >= 2
+
+    def detail(tag_count):
+        post = get_json(client, f"/posts/{posts[tag_count]}")
+        assert len(post["tags"]) == tag_count
+
+    assert_constant_queries(detail, sorted(posts))
+
+
+def test_by_tags_queries_do_not_grow_with_result_size(client):
+    tags = tags_by_popularity()
+    cases = {
+        len(get_json(client, "/posts/by-tags", tags=pair)): pair
+        for pair in (tags[-2:], tags[len(tags) // 2:len(tags) // 2 + 2], tags[:2])
+    }
+    assert len(cases) >= 2
+    assert_constant_queries(lambda size: get_json(client, "/posts/by-tags", tags=cases[size]), sorted(cases))
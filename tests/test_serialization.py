@@ -0,0 +1,114 @@
+# Serialización rápida (SERIALIZATION_MODE="fast") frente al camino pydantic: mismos bytes y ETags
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models import PostORM, UserORM
+
+MODES = ("fast", "pydantic")
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture(scope="module")
+def special_posts(client, auth_headers):
+    # texto con unicode y caracteres de control, autor con email y nombre raros, y un post con derivados
+    with SessionLocal() as db:
+        author = UserORM(email="Serial@Example.COM", full_name="Ñandú   \x07 \"q\" </script>", role="editor", hashed_password="x")
+        db.add(author)
+        db.commit()
+        author_id = author.id
+
+    response = client.post("/posts", headers=auth_headers, data={
+        "title": "Ünïcödé   título 😀",
+        "content": "contenido con \t tab, \x01 control, comillas \" y \\ barra, emoji 😀 y é",
+        "category_id": 1,
+        "tags": ["python", "émoji"],
+    })
+    assert response.status_code == 201, response.text
+    unicode_post = response.json()
+
+    response = client.post("/posts", headers=auth_headers, data={
+        "title": "Post con derivados de imagen", "content": "contenido del post con variantes", "category_id": 1,
+    })
+    assert response.status_code == 201, response.text
+    variants_post = response.json()
+
+    variants = [
+        {"width": 320, "height": 240, "content_type": "image/webp", "url": "/media/ab/abc-320.webp"},
+        {"width": 640, "height": 480, "content_type": "image/jpeg", "url": "/media/ab/abc-640.jpg"},
+    ]
+    with SessionLocal() as db:
+        db.execute(update(PostORM).where(PostORM.id == unicode_post["id"]).values(user_id=author_id))
+        db.execute(
+            update(PostORM)
+            .where(PostORM.id == variants_post["id"])
+            .values(image_url="/media/ab/abc.png", image_variants=variants, version=PostORM.version + 1)
+        )
+        db.commit()
+    return unicode_post, variants_post
+
+
+def in_mode(monkeypatch, mode, request):
+    monkeypatch.setattr(settings, "SERIALIZATION_MODE", mode)
+    return request()
+
+
+def read_urls(special_posts):
+    unicode_post, variants_post = special_posts
+    urls = [
+        "/posts?limit=100",
+        "/posts?limit=20&direction=desc",
+        "/posts?limit=3&offset=5&order_by=title&direction=desc",
+        "/posts?limit=5&pagination=cursor",
+        "/posts?q=numero&limit=7",
+        "/posts/by-tags?tags=python&tags=émoji",
+    ]
+    for post in special_posts:
+        urls += [
+            f"/posts/{post['id']}",
+            f"/posts/{post['id']}?include_content=false",
+            f"/posts/post/{post['slug']}",
+            f"/posts/post/{post['slug']}?include_content=false",
+        ]
+    return urls
+
+
+def test_reads_match_in_both_modes(client, special_posts, monkeypatch):
+    newest = {post["id"] for post in client.get("/posts", params={"limit": 20, "direction": "desc"}).json()["items"]}
+    assert {post["id"] for post in special_posts} <= newest
+    for url in read_urls(special_posts):
+        fast, slow = (in_mode(monkeypatch, mode, lambda: client.get(url, headers=IDENTITY)) for mode in MODES)
+        assert fast.status_code == slow.status_code == 200, url
+        assert fast.content == slow.content, url
+        assert fast.headers["content-type"] == slow.headers["content-type"], url
+        assert fast.headers.get("etag") == slow.headers.get("etag"), url
+
+
+def test_cursor_pages_match_in_both_modes(client, special_posts, monkeypatch):
+    first = client.get("/posts", params={"limit": 5, "pagination": "cursor"}).json()
+    url = f"/posts?limit=5&pagination=cursor&cursor={first['next_cursor']}"
+    fast, slow = (in_mode(monkeypatch, mode, lambda: client.get(url, headers=IDENTITY)) for mode in MODES)
+    assert fast.status_code == slow.status_code == 200
+    assert fast.content == slow.content
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_writes_match_the_other_mode(client, auth_headers, special_posts, monkeypatch, mode):
+    other = MODES[1 - MODES.index(mode)]
+    created = in_mode(monkeypatch, mode, lambda: client.post("/posts", headers=auth_headers, data={
+        "title": f"Creado en modo {mode} ✓", "content": "contenido con \x02 control y ñ", "category_id": 1, "tags": ["émoji"],
+    }))
+    assert created.status_code == 201, created.text
+    post_id = created.json()["id"]
+    assert created.content == in_mode(monkeypatch, other, lambda: client.get(f"/posts/{post_id}", headers=IDENTITY)).content
+
+    updated = in_mode(monkeypatch, mode, lambda: client.put(
+        f"/posts/{special_posts[1]['id']}", headers=auth_headers, json={"content": f"editado en modo {mode} ✓"}
+    ))
+    assert updated.status_code == 202, updated.text
+    assert updated.json()["image_variants"]
+    assert updated.content == in_mode(
+        monkeypatch, other, lambda: client.get(f"/posts/{special_posts[1]['id']}", headers=IDENTITY)
+    ).content
@@ -0,0 +1,48 @@
+# Caché de tags con varios workers: otro proceso renombra o borra sin tocar la caché de este
+
+from sqlalchemy import delete, update
+
+from app.api.v1.posts.repository import PostRepository
+from app.core.db import SessionLocal
+from app.models import TagORM, post_tags
+from app.services.tag_cache import bump_tag_generation, tag_cache
+
+
+def resolve(*names) -> dict:
+    with SessionLocal() as db:
+        resolved = PostRepository(db).resolve_tags(names)
+        db.commit()
+    return resolved
+
+
+def other_worker(*statements) -> None:
+    # como lo haría TagRepository en otro proceso: misma transacción, sin pasar por tag_cache
+    with SessionLocal() as db:
+        for statement in statements:
+            db.execute(statement)
+        bump_tag_generation(db)
+        db.commit()
+
+
+def test_renamed_tag_is_not_reused_from_cache(client):
+    tag_id = resolve("cache-antiguo")["cache-antiguo"]
+    assert tag_cache.get("cache-antiguo") == tag_id
+
+    other_worker(update(TagORM).where(TagORM.id == tag_id).values(name="cache-renombrado"))
+
+    assert resolve("cache-antiguo")["cache-antiguo"] != tag_id
+    assert resolve("cache-renombrado")["cache-renombrado"] == tag_id
+
+
+def test_deleted_tag_is_not_reused_from_cache(client):
+    tag_id = resolve("cache-borrado")["cache-borrado"]
+
+    other_worker(
+        delete(post_tags).where(post_tags.c.tag_id == tag_id),
+        delete(TagORM).where(TagORM.id == tag_id),
+    )
+
+    new_id = resolve("cache-borrado")["cache-borrado"]
+    with SessionLocal() as db:
+        # SQLite puede reutilizar el id; lo que importa es que exista y sea este tag
+        assert db.get(TagORM, new_id).name == "cache-borrado"